@@ -0,0 +1,148 @@
+# agendador.py
+"""Importação periódica da planilha com um único agendador entre todos os processos.
+
+Cada processo (workers do gunicorn, os dois processos do reloader) roda uma thread
+leve que disputa a liderança na tabela `lideranca`. Só o líder mantém o
+BackgroundScheduler, que dispara a primeira importação ao assumir pela primeira
+vez (a importação inicial, fora do caminho de inicialização) e depois a cada
+IMPORTACAO_INTERVALO_MINUTOS. O líder renova a concessão a cada terço de
+AGENDADOR_LEASE_SEGUNDOS; se o processo morrer, outro assume quando ela expirar.
+Enquanto uma importação roda no agendador do processo, ele não o desliga, mesmo
+sem conseguir renovar (no SQLite a própria importação segura as escritas).
+"""
+import atexit
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+from models import db, Lideranca
+
+NOME_LIDERANCA = 'agendador_importacao'
+
+try:
+    from apscheduler.schedulers.background import BackgroundScheduler
+    APSCHEDULER_AVAILABLE = True
+except ImportError:
+    APSCHEDULER_AVAILABLE = False
+
+# ==========================
+# Concessão de liderança
+# ==========================
+def identificador_processo():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def tentar_lideranca(nome, dono, ttl_segundos):
+    """Assume ou renova a liderança `nome` para `dono`. Retorna True se `dono` é o líder."""
+    if db.session.get(Lideranca, nome) is None:
+        try:
+            db.session.add(Lideranca(nome=nome))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+    agora = datetime.utcnow()
+    result = db.session.execute(
+        update(Lideranca)
+        .where(Lideranca.nome == nome)
+        .where(or_(Lideranca.dono == dono, Lideranca.dono.is_(None), Lideranca.expira_em < agora))
+        .values(dono=dono, expira_em=agora + timedelta(seconds=ttl_segundos))
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def renunciar_lideranca(nome, dono):
+    db.session.execute(
+        update(Lideranca)
+        .where(Lideranca.nome == nome, Lideranca.dono == dono)
+        .values(dono=None, expira_em=None)
+    )
+    db.session.commit()
+
+# ==========================
+# Agendador
+# ==========================
+def _criar_scheduler(app, importacao_inicial=True, em_execucao=None):
+    """BackgroundScheduler com a importação periódica (e a inicial, se pedida).
+
+    `em_execucao` (set) recebe a thread de cada importação enquanto ela roda.
+    """
+    from import_jobs import submeter_importacao, status_job
+    em_execucao = em_execucao if em_execucao is not None else set()
+
+    def job_wrapper(origem='agendador'):
+        em_execucao.add(threading.get_ident())
+        try:
+            with app.app_context():
+                job_id, novo = submeter_importacao(origem=origem, em_background=False)
+                if novo:
+                    app.logger.info(f"Importação automática executada: {status_job(job_id)['resumo']}")
+                else:
+                    app.logger.info(f"Importação automática ignorada: job {job_id} já em andamento")
+        finally:
+            em_execucao.discard(threading.get_ident())
+
+    scheduler = BackgroundScheduler()
+    if importacao_inicial:
+        # importação inicial assim que o processo assume, sem atrasar a inicialização
+        scheduler.add_job(job_wrapper, 'date', run_date=datetime.now(), args=['inicializacao'],
+                          id='import_pcp_inicial', replace_existing=True)
+    scheduler.add_job(job_wrapper, 'interval', minutes=app.config.get('IMPORTACAO_INTERVALO_MINUTOS', 5),
+                      id='import_pcp_every_5m', replace_existing=True)
+    return scheduler
+
+def iniciar_agendador(app):
+    """Começa a disputar a liderança do agendador neste processo (thread em segundo plano)."""
+    if not APSCHEDULER_AVAILABLE:
+        app.logger.info("APScheduler não disponível.")
+        return
+    if not app.config.get('AGENDADOR_HABILITADO', True):
+        app.logger.info("Agendador desabilitado (AGENDADOR_HABILITADO).")
+        return
+    dono = identificador_processo()
+    ttl = app.config.get('AGENDADOR_LEASE_SEGUNDOS', 60)
+
+    def ciclo():
+        scheduler = None
+        valido_ate = 0.0  # até quando a última renovação confirmada garante a liderança
+        ja_foi_lider = False
+        em_execucao = set()  # threads do agendador rodando uma importação agora
+        while True:
+            with app.app_context():
+                try:
+                    lider = tentar_lideranca(NOME_LIDERANCA, dono, ttl)
+                    if lider:
+                        valido_ate = time.monotonic() + ttl
+                except Exception:
+                    # banco ocupado (ex.: importação em andamento no SQLite): mantém o
+                    # estado atual enquanto a última renovação vale ou a importação roda
+                    db.session.rollback()
+                    lider = scheduler is not None and (bool(em_execucao) or time.monotonic() < valido_ate)
+                finally:
+                    db.session.remove()
+
+            if lider and scheduler is None:
+                scheduler = _criar_scheduler(app, importacao_inicial=not ja_foi_lider, em_execucao=em_execucao)
+                scheduler.start()
+                ja_foi_lider = True
+                app.logger.info(f"Agendador iniciado neste processo ({dono}): import_pcp_every_5m")
+            elif not lider and scheduler is not None and em_execucao:
+                # a importação em andamento termina aqui; a trava da importação impede outra em paralelo
+                app.logger.warning(f"Liderança do agendador não renovada durante a importação ({dono})")
+            elif not lider and scheduler is not None:
+                scheduler.shutdown(wait=False)
+                scheduler = None
+                app.logger.info(f"Liderança do agendador perdida ({dono})")
+            time.sleep(ttl / 3)
+
+    def ao_sair():
+        with app.app_context():
+            try:
+                renunciar_lideranca(NOME_LIDERANCA, dono)
+            except Exception:
+                pass
+
+    atexit.register(ao_sair)
+    threading.Thread(target=ciclo, name='agendador-lideranca', daemon=True).start()
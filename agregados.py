@@ -0,0 +1,220 @@
+# agregados.py
+"""Agregados diários para os relatórios gerenciais (/api/analytics).
+
+Duas tabelas mantidas de forma incremental, na mesma transação de quem grava:
+
+- resumo_diario: itens e quantidade do painel por (data, cliente, status). A
+  importação (importer.upsert_item_status) e as transições de status
+  (transicoes.ao_transicionar) aplicam só a diferença do que gravaram.
+- lead_time_diario: por dia de conclusão (UTC) e cliente, quantas entregas
+  chegaram a "Entrega concluída" e a soma dos segundos desde o recebimento do
+  item: ItemStatus.recebido_em, gravado pela importação ao criar a linha, ou,
+  nas linhas importadas antes dessa coluna, o primeiro registro de "Recebido"
+  no ItemHistory (entrando ou saindo desse status).
+
+Os agregados cobrem o painel (ItemStatus). `python agregados.py` reconstrói as
+duas tabelas a partir de item_status e item_history (carga inicial ou correção).
+"""
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import select, insert, update, delete, func, bindparam, or_
+from models import db, ItemStatus, ItemHistory, ResumoDiario, LeadTimeDiario
+
+STATUS_INICIO = 'Recebido'
+STATUS_FIM = 'Entrega concluída'
+
+# ==========================
+# Aplicação de diferenças
+# ==========================
+def _somar(modelo, chaves, deltas):
+    """Soma `deltas` ({chave: {coluna: delta}}) nas linhas de `modelo`, criando as que faltam.
+
+    Uma consulta para achar as linhas existentes, um UPDATE em lote com incremento
+    (coluna = coluna + delta, sem sobrescrever gravações concorrentes) e um INSERT em lote.
+    """
+    deltas = {k: d for k, d in deltas.items() if any(d.values())}
+    if not deltas:
+        return
+    colunas = [getattr(modelo, c) for c in chaves]
+    existentes = set(db.session.execute(
+        select(*colunas).where(colunas[0].in_({k[0] for k in deltas}))
+    ).all())
+
+    atualizar, inserir = [], []
+    for k, d in deltas.items():
+        if k in existentes:
+            atualizar.append(dict({f'b_{c}': v for c, v in zip(chaves, k)},
+                                  **{f'd_{c}': v for c, v in d.items()}))
+        else:
+            inserir.append(dict(zip(chaves, k), **d))
+
+    if atualizar:
+        campos = list(next(iter(deltas.values())))
+        tabela = modelo.__table__
+        db.session.execute(
+            update(tabela)
+            .where(*(tabela.c[c] == bindparam(f'b_{c}') for c in chaves))
+            .values({c: tabela.c[c] + bindparam(f'd_{c}') for c in campos}),
+            atualizar,
+        )
+    if inserir:
+        db.session.execute(insert(modelo), inserir)
+
+def somar_resumo(deltas):
+    """deltas: {(data, cliente, status): {'itens': n, 'quantidade': q}}."""
+    _somar(ResumoDiario, ('data', 'cliente', 'status'), deltas)
+
+def somar_lead_time(deltas):
+    """deltas: {(data, cliente): {'entregas': n, 'soma_segundos': s}}."""
+    _somar(LeadTimeDiario, ('data', 'cliente'), deltas)
+
+def delta_resumo():
+    return defaultdict(lambda: {'itens': 0, 'quantidade': 0})
+
+def _inicio_por_item(ids=None):
+    """{item_status_id: início do lead time} para os ids informados (None: todos).
+
+    recebido_em quando a importação o gravou; senão o primeiro registro de
+    "Recebido" no ItemHistory.
+    """
+    if ids is not None and not ids:
+        return {}
+    historico = select(ItemHistory.item_status_id, func.min(ItemHistory.criado_em)) \
+        .where(ItemHistory.item_status_id.is_not(None)) \
+        .where(or_(ItemHistory.to_status == STATUS_INICIO, ItemHistory.from_status == STATUS_INICIO)) \
+        .group_by(ItemHistory.item_status_id)
+    recebimento = select(ItemStatus.id, ItemStatus.recebido_em).where(ItemStatus.recebido_em.is_not(None))
+    if ids is not None:
+        historico = historico.where(ItemHistory.item_status_id.in_(ids))
+        recebimento = recebimento.where(ItemStatus.id.in_(ids))
+    inicios = dict(db.session.execute(historico).all())
+    inicios.update(db.session.execute(recebimento).all())
+    return inicios
+
+def atualizar_por_transicoes(transicoes):
+    """Assinante de transicoes.ao_transicionar: aplica as transições do painel nos agregados."""
+    transicoes = [t for t in transicoes if t.tipo == 'item_status']
+    if not transicoes:
+        return
+
+    resumo = delta_resumo()
+    for t in transicoes:
+        resumo[(t.data, t.cliente, t.de)]['itens'] -= 1
+        resumo[(t.data, t.cliente, t.de)]['quantidade'] -= t.quantidade
+        resumo[(t.data, t.cliente, t.para)]['itens'] += 1
+        resumo[(t.data, t.cliente, t.para)]['quantidade'] += t.quantidade
+    somar_resumo(resumo)
+
+    concluidas = [t for t in transicoes if t.para == STATUS_FIM and t.de != STATUS_FIM]
+    inicios = _inicio_por_item([t.id for t in concluidas])
+    lead = defaultdict(lambda: {'entregas': 0, 'soma_segundos': 0.0})
+    for t in concluidas:
+        inicio = inicios.get(t.id)
+        if inicio is None or inicio > t.hora:
+            continue
+        chave = (t.hora.date(), t.cliente)
+        lead[chave]['entregas'] += 1
+        lead[chave]['soma_segundos'] += (t.hora - inicio).total_seconds()
+    somar_lead_time(lead)
+
+# ==========================
+# Reconstrução (carga inicial)
+# ==========================
+def reconstruir_agregados():
+    """Recalcula resumo_diario e lead_time_diario do zero, sem commit.
+
+    Retorna {'resumo_diario': linhas, 'lead_time_diario': linhas}.
+    """
+    db.session.execute(delete(ResumoDiario))
+    db.session.execute(delete(LeadTimeDiario))
+
+    db.session.execute(insert(ResumoDiario).from_select(
+        ['data', 'cliente', 'status', 'itens', 'quantidade'],
+        select(ItemStatus.data, ItemStatus.cliente, ItemStatus.status,
+               func.count(), func.coalesce(func.sum(ItemStatus.quantidade), 0))
+        .group_by(ItemStatus.data, ItemStatus.cliente, ItemStatus.status)
+    ))
+
+    inicios = _inicio_por_item()
+    lead = defaultdict(lambda: {'entregas': 0, 'soma_segundos': 0.0})
+    for id_, cliente, hora in db.session.execute(
+        select(ItemHistory.item_status_id, ItemStatus.cliente, ItemHistory.criado_em)
+        .join(ItemStatus, ItemStatus.id == ItemHistory.item_status_id)
+        .where(ItemHistory.to_status == STATUS_FIM)
+        .where(or_(ItemHistory.from_status.is_(None), ItemHistory.from_status != STATUS_FIM))
+    ):
+        inicio = inicios.get(id_)
+        if inicio is None or inicio > hora:
+            continue
+        lead[(hora.date(), cliente)]['entregas'] += 1
+        lead[(hora.date(), cliente)]['soma_segundos'] += (hora - inicio).total_seconds()
+    if lead:
+        db.session.execute(insert(LeadTimeDiario), [
+            {'data': data, 'cliente': cliente, **valores} for (data, cliente), valores in lead.items()
+        ])
+
+    return {
+        'resumo_diario': db.session.execute(select(func.count()).select_from(ResumoDiario)).scalar(),
+        'lead_time_diario': len(lead),
+    }
+
+# ==========================
+# Consultas por período
+# ==========================
+def periodo_de(data, agrupar):
+    """Início do período (dia, semana começando na segunda ou mês) que contém `data`."""
+    if agrupar == 'semana':
+        return data - timedelta(days=data.weekday())
+    if agrupar == 'mes':
+        return data.replace(day=1)
+    return data
+
+def consultar(inicio, fim, agrupar='dia', cliente=None):
+    """Totais do intervalo [inicio, fim] agrupados por período, lidos só dos agregados."""
+    consulta_resumo = select(ResumoDiario.data, ResumoDiario.cliente, ResumoDiario.status,
+                             ResumoDiario.itens, ResumoDiario.quantidade) \
+        .where(ResumoDiario.data.between(inicio, fim))
+    consulta_lead = select(LeadTimeDiario.data, LeadTimeDiario.cliente,
+                           LeadTimeDiario.entregas, LeadTimeDiario.soma_segundos) \
+        .where(LeadTimeDiario.data.between(inicio, fim))
+    if cliente:
+        consulta_resumo = consulta_resumo.where(ResumoDiario.cliente == cliente)
+        consulta_lead = consulta_lead.where(LeadTimeDiario.cliente == cliente)
+
+    status = defaultdict(lambda: {'itens': 0, 'quantidade': 0})
+    for data, cli, st, itens, quantidade in db.session.execute(consulta_resumo):
+        chave = (periodo_de(data, agrupar), cli, st)
+        status[chave]['itens'] += itens
+        status[chave]['quantidade'] += quantidade
+
+    lead = defaultdict(lambda: {'entregas': 0, 'soma_segundos': 0.0})
+    for data, cli, entregas, soma in db.session.execute(consulta_lead):
+        chave = (periodo_de(data, agrupar), cli)
+        lead[chave]['entregas'] += entregas
+        lead[chave]['soma_segundos'] += soma
+
+    return {
+        'status': [
+            {'periodo': p.isoformat(), 'cliente': cli, 'status': st, **v}
+            for (p, cli, st), v in sorted(status.items()) if v['itens']
+        ],
+        'lead_time': [
+            {'periodo': p.isoformat(), 'cliente': cli, 'entregas': v['entregas'],
+             'media_horas': round(v['soma_segundos'] / v['entregas'] / 3600, 2)}
+            for (p, cli), v in sorted(lead.items()) if v['entregas']
+        ],
+    }
+
+if __name__ == '__main__':
+    from flask import Flask
+    from config import Config
+    from banco import configurar_engine
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    with app.app_context():
+        configurar_engine(app)
+        db.create_all()
+        linhas = reconstruir_agregados()
+        db.session.commit()
+        print(f"Agregados reconstruídos: {linhas}")
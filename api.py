@@ -0,0 +1,87 @@
+from datetime import datetime, date, timedelta
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from flask_login import login_required
+from dashboard_cache import versao_data, itens_da_data, pagina_itens
+from agregados import consultar
+import eventos
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+@api_bp.route('/items')
+@login_required
+def items():
+    """Itens da data; com ?since=<versao> só os alterados depois dessa versão."""
+    data_str = request.args.get('data')
+    try:
+        data = datetime.strptime(data_str, '%Y-%m-%d').date() if data_str else date.today()
+        since = request.args.get('since', type=int)
+    except ValueError:
+        return jsonify({'ok': False, 'msg': 'Parâmetro data inválido'}), 400
+
+    versao = versao_data(data)
+    itens = [] if since is not None and since >= versao else itens_da_data(data, since)
+    return jsonify({'ok': True, 'data': data.isoformat(), 'versao': versao, 'itens': itens})
+
+def ler_filtros_periodo(args):
+    """Lê data_inicio, data_fim, cliente, status e cursor da query string.
+
+    Sem data_fim, o período é só data_inicio; sem nenhuma das duas, é hoje.
+    ValueError se alguma data for inválida ou o período estiver invertido.
+    """
+    inicio = datetime.strptime(args['data_inicio'], '%Y-%m-%d').date() if args.get('data_inicio') else date.today()
+    fim = datetime.strptime(args['data_fim'], '%Y-%m-%d').date() if args.get('data_fim') else inicio
+    if inicio > fim:
+        raise ValueError('data_inicio depois de data_fim')
+    return {
+        'inicio': inicio,
+        'fim': fim,
+        'cliente': args.get('cliente') or None,
+        'status': args.get('status') or None,
+        'cursor': args.get('cursor') or None,
+    }
+
+@api_bp.route('/items/pagina')
+@login_required
+def items_pagina():
+    """Itens de um período, em páginas: ?data_inicio&data_fim&cliente&status&cursor&limite."""
+    try:
+        filtros = ler_filtros_periodo(request.args)
+        limite = min(request.args.get('limite', current_app.config.get('DASHBOARD_PAGE_SIZE', 200), type=int), 1000)
+        itens, proximo = pagina_itens(limite=max(limite, 1), **filtros)
+    except ValueError as e:
+        return jsonify({'ok': False, 'msg': str(e)}), 400
+    return jsonify({'ok': True, 'data_inicio': filtros['inicio'].isoformat(), 'data_fim': filtros['fim'].isoformat(),
+                    'itens': itens, 'proximo': proximo})
+
+@api_bp.route('/analytics')
+@login_required
+def analytics():
+    """Totais por período a partir dos agregados diários.
+
+    ?inicio=AAAA-MM-DD&fim=AAAA-MM-DD (padrão: últimos 30 dias), ?agrupar=dia|semana|mes
+    e, opcionalmente, ?cliente=<nome>.
+    """
+    try:
+        fim = datetime.strptime(request.args['fim'], '%Y-%m-%d').date() if request.args.get('fim') else date.today()
+        inicio = datetime.strptime(request.args['inicio'], '%Y-%m-%d').date() if request.args.get('inicio') \
+            else fim - timedelta(days=29)
+    except ValueError:
+        return jsonify({'ok': False, 'msg': 'Parâmetros inicio/fim inválidos'}), 400
+    agrupar = request.args.get('agrupar', 'dia')
+    if agrupar not in ('dia', 'semana', 'mes'):
+        return jsonify({'ok': False, 'msg': 'agrupar deve ser dia, semana ou mes'}), 400
+    if inicio > fim:
+        return jsonify({'ok': False, 'msg': 'inicio depois de fim'}), 400
+
+    dados = consultar(inicio, fim, agrupar, request.args.get('cliente'))
+    return jsonify({'ok': True, 'inicio': inicio.isoformat(), 'fim': fim.isoformat(),
+                    'agrupar': agrupar, **dados})
+
+@api_bp.route('/eventos')
+@login_required
+def stream_eventos():
+    fila = eventos.assinar(current_app.config.get('EVENTOS_FILA_MAX', eventos.FILA_MAX))
+    resp = Response(stream_with_context(eventos.stream(fila)), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
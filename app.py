@@ -1,19 +1,29 @@
 # app.py
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, make_response, session, flash, redirect, url_for
 from flask_login import LoginManager, login_required, current_user
 from flask_mail import Mail
 from config import Config
-from models import db, User, ItemStatus
+from models import db
+from cache_usuarios import carregar_usuario
 from auth_routes import auth_bp
 from pcp import pcp_bp
+from logistica import logistica_bp
+from faturamento import faturamento_bp
+from api import api_bp, ler_filtros_periodo
+from exportacao import exportacao_bp
 from datetime import datetime, date
-from importer import importar_planilha
-
-try:
-    from apscheduler.schedulers.background import BackgroundScheduler
-    APSCHEDULER_AVAILABLE = True
-except:
-    APSCHEDULER_AVAILABLE = False
+from import_jobs import submeter_importacao, status_job
+from dashboard_cache import payload_dashboard, pagina_itens
+from migracoes import aplicar_migracoes
+from agendador import iniciar_agendador
+from caixa_saida import iniciar_envio
+from banco import configurar_engine
+from metricas import instrumentar, metricas_bp
+from confirmacao import emitir_token, validar_token
+from transicoes import (transicionar_item_status, transicionar_itens, papeis_permitidos,
+                        ao_transicionar, FLUXO)
+from eventos import publicar_transicoes
+from agregados import atualizar_por_transicoes
 
 mail = Mail()
 
@@ -22,26 +32,84 @@ def create_app():
     app.config.from_object(Config)
     db.init_app(app)
     mail.init_app(app)
+    with app.app_context():
+        configurar_engine(app)
+        instrumentar(app)
+
+    ao_transicionar(publicar_transicoes)
+    ao_transicionar(atualizar_por_transicoes)
 
     login_manager = LoginManager(app)
     login_manager.login_view = 'auth.login'
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return carregar_usuario(int(user_id))
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(pcp_bp)
+    app.register_blueprint(logistica_bp)
+    app.register_blueprint(faturamento_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(exportacao_bp)
+    app.register_blueprint(metricas_bp)
 
     @app.route('/')
     @login_required
     def index():
+        if any(request.args.get(k) for k in ('data_inicio', 'data_fim', 'cliente', 'status')):
+            return painel_periodo()
         selected_date_str = request.args.get('data')
         selected_date = datetime.strptime(selected_date_str, '%Y-%m-%d').date() if selected_date_str else date.today()
-        itens = ItemStatus.query.filter_by(data=selected_date).all()
-        grouped = {}
+        versao, grouped = payload_dashboard(selected_date)
+
+        # ETag por data, versão e usuário (o menu mostra o nome de quem está logado)
+        etag = f"{selected_date.isoformat()}-{versao}-{current_user.id}"
+        if etag in request.if_none_match and not session.get('_flashes'):
+            resp = make_response('', 304)
+        else:
+            resp = make_response(render_template('dashboard.html', grupos=list(grouped.items()), versao=versao,
+                                                 status_opcoes=FLUXO, filtros=None, proximo=None,
+                                                 selected_date=selected_date, user=current_user))
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'private, no-cache'
+        return resp
+
+    def painel_periodo():
+        """Painel de vários dias com filtros, em páginas (cursor em ?cursor=)."""
+        try:
+            filtros = ler_filtros_periodo(request.args)
+            itens, proximo = pagina_itens(limite=app.config['DASHBOARD_PAGE_SIZE'], **filtros)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('index'))
+
+        # agrupa por data e cliente, mantendo a ordem da página
+        grupos = {}
         for item in itens:
-            grouped.setdefault(item.cliente, []).append(item.to_dict())
-        return render_template('dashboard.html', grouped=grouped, selected_date=selected_date, user=current_user)
+            grupos.setdefault((item['data'], item['cliente']), []).append(item)
+        grupos = [(f"{cliente} · {datetime.strptime(d, '%Y-%m-%d').strftime('%d/%m/%Y')}", lista)
+                  for (d, cliente), lista in grupos.items()]
+        return render_template('dashboard.html', grupos=grupos, versao=0, status_opcoes=FLUXO,
+                               filtros=filtros, proximo=proximo,
+                               selected_date=filtros['inicio'], user=current_user)
+
+    def confirmar_alteracao(data):
+        """Confere o token de confirmação ou, sem ele, a senha (e emite um token novo).
+
+        Retorna (erro, token, ttl): `erro` é o corpo JSON de falha ou None; `ttl` só
+        vem preenchido quando um token novo foi emitido.
+        """
+        # token de confirmação ainda válido dispensa a verificação (cara) da senha
+        token = data.get('token')
+        if validar_token(token, current_user.id):
+            return None, token, None
+        senha = data.get('senha')
+        if not senha:
+            return {'success': False, 'msg': 'Confirme com sua senha', 'senha_necessaria': True}, None, None
+        if not current_user.check_password(senha):
+            return {'success': False, 'msg': 'Senha incorreta', 'senha_necessaria': True}, None, None
+        token, ttl = emitir_token(current_user.id)
+        return None, token, ttl
 
     @app.route('/update_status', methods=['POST'])
     @login_required
@@ -49,58 +117,98 @@ def create_app():
         data = request.get_json()
         modelo = data.get('modelo')
         novo_status = data.get('status')
-        senha = data.get('senha')
         selected_date_str = data.get('data')
         selected_date = datetime.strptime(selected_date_str, '%Y-%m-%d').date() if selected_date_str else date.today()
 
-        if not current_user.check_password(senha):
-            return jsonify({'success': False, 'msg': 'Senha incorreta'})
-
-        item = ItemStatus.query.filter_by(modelo=modelo, data=selected_date).first()
-        if not item:
-            return jsonify({'success': False, 'msg': 'Item não encontrado'})
+        erro, token, ttl = confirmar_alteracao(data)
+        if erro:
+            return jsonify(erro)
 
-        item.status = novo_status
-        item.usuario_ultimo_update = current_user.username
-        item.hora_ultimo_update = datetime.now()
+        resultado = transicionar_item_status(selected_date, [modelo], novo_status,
+                                             current_user.username, current_user.id)[0]
+        if not resultado['ok']:
+            db.session.rollback()
+            return jsonify({'success': False, 'msg': resultado['msg']})
         db.session.commit()
 
-        return jsonify({
+        resposta = {
             'success': True,
-            'hora': item.hora_ultimo_update.strftime('%d/%m/%Y %H:%M'),
-            'usuario': item.usuario_ultimo_update
-        })
+            'hora': resultado['hora'],
+            'usuario': resultado['usuario']
+        }
+        if ttl:
+            resposta.update(token=token, token_ttl=ttl)
+        return jsonify(resposta)
+
+    @app.route('/bulk_update_status', methods=['POST'])
+    @login_required
+    def bulk_update_status():
+        """Muda o status de vários itens de uma vez.
+
+        JSON: {'status', 'modelos' + 'data'} para o painel (ItemStatus) ou
+        {'status', 'item_ids', 'comentario'} para Items. Confirmação como em update_status.
+        """
+        data = request.get_json() or {}
+        novo_status = data.get('status')
+        modelos = data.get('modelos') or []
+        item_ids = data.get('item_ids') or []
+        if not novo_status or not (modelos or item_ids):
+            return jsonify({'success': False, 'msg': 'Informe status e itens'}), 400
+        try:
+            if not isinstance(item_ids, list):
+                raise TypeError
+            item_ids = [int(i) for i in item_ids]
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'msg': 'item_ids deve ser uma lista de números'}), 400
+        if not isinstance(modelos, list) or not all(isinstance(m, str) for m in modelos):
+            return jsonify({'success': False, 'msg': 'modelos deve ser uma lista de textos'}), 400
+        try:
+            selected_date_str = data.get('data')
+            selected_date = datetime.strptime(selected_date_str, '%Y-%m-%d').date() if selected_date_str else date.today()
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'msg': 'Data inválida (use AAAA-MM-DD)'}), 400
+        if item_ids and current_user.role not in papeis_permitidos(novo_status):
+            return jsonify({'success': False, 'msg': 'Acesso negado'}), 403
+
+        erro, token, ttl = confirmar_alteracao(data)
+        if erro:
+            return jsonify(erro)
+
+        resposta = {'success': True}
+        if modelos:
+            resposta['modelos'] = transicionar_item_status(selected_date, modelos, novo_status,
+                                                           current_user.username, current_user.id)
+        if item_ids:
+            resposta['itens'] = transicionar_itens(item_ids, novo_status,
+                                                   current_user.id, data.get('comentario'))
+        db.session.commit()
+
+        if ttl:
+            resposta.update(token=token, token_ttl=ttl)
+        return jsonify(resposta)
 
     @app.route('/pcp/import_now', methods=['POST'])
     @login_required
     def import_now_route():
         if current_user.role not in ['pcp', 'admin']:
             return jsonify({'ok': False, 'msg': 'Acesso negado'}), 403
-        resumo = importar_planilha()
-        return jsonify({'ok': True, 'resumo': resumo})
-
-    # Scheduler automático
-    def start_scheduler():
-        if not APSCHEDULER_AVAILABLE:
-            app.logger.info("APScheduler não disponível.")
-            return
-        scheduler = BackgroundScheduler()
-        def job_wrapper():
-            with app.app_context():
-                resumo = importar_planilha()
-                app.logger.info(f"Importação automática executada: {resumo}")
-        scheduler.add_job(job_wrapper, 'interval', minutes=5, id='import_pcp_every_5m', replace_existing=True)
-        scheduler.start()
-        app.logger.info("Scheduler iniciado: import_pcp_every_5m")
+        job_id, novo = submeter_importacao(origem='usuario', solicitado_por=current_user.id)
+        return jsonify({'ok': True, 'job_id': job_id, 'novo': novo}), 202
+
+    @app.route('/pcp/import_jobs/<int:job_id>')
+    @login_required
+    def import_job_status(job_id):
+        job = status_job(job_id)
+        if not job:
+            return jsonify({'ok': False, 'msg': 'Job não encontrado'}), 404
+        return jsonify({'ok': True, 'job': job})
 
     with app.app_context():
-        try:
-            app.logger.info("Importação inicial da planilha...")
-            resumo = importar_planilha()
-            app.logger.info(f"Resumo inicial: {resumo}")
-        except:
-            app.logger.exception("Erro na importação inicial")
-        start_scheduler()
+        aplicar_migracoes()
+    # importação inicial e periódica ficam com o processo líder, em segundo plano
+    iniciar_agendador(app)
+    # e-mails enfileirados pelas rotas saem por esta thread
+    iniciar_envio(app)
 
     return app
 
@@ -111,11 +219,11 @@ if __name__ == '__main__':
     app.run(host="0.0.0.0", port=5000, debug=True)
 
 
-git init
-=/ Cria (ou reinicializa) um repositório GIT na pasta atual
-
-git remote add origin https do repositório
-=/ Conecta seu projeto local com o repositório
-
-git remote -v 
-=/ Verifica o endereço do repositório atual
+# git init
+# =/ Cria (ou reinicializa) um repositório GIT na pasta atual
+#
+# git remote add origin https do repositório
+# =/ Conecta seu projeto local com o repositório
+#
+# git remote -v
+# =/ Verifica o endereço do repositório atual
@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
-from flask_login import login_user, logout_user, login_required
+from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask_login import login_user, logout_user, login_required, current_user
 from models import db, User
+from confirmacao import revogar_tokens
+from cache_usuarios import invalidar_usuario
+from caixa_saida import enfileirar_email
 import unicodedata, re
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -13,14 +16,11 @@ def make_username(full_name, setor):
     return f"{first}.{last}.{setor}".lower()
 
 def enviar_email_cadastro(destino, username):
-    mail = current_app.extensions.get('mail')
-    if not mail:
-        print("Flask-Mail não encontrado")
+    """Enfileira o e-mail de boas-vindas (sem commit); o envio sai em segundo plano."""
+    if not destino:
         return
-    try:
-        mail.send()
-    except Exception as e:
-        print(f"Erro enviando email: {e}")
+    enfileirar_email(destino, 'Cadastro no Sistema de Logística',
+                     f"Olá!\n\nSeu cadastro foi criado. Usuário de acesso: {username}\n")
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -29,6 +29,7 @@ def login():
         password = request.form['password']
         user = User.query.filter_by(username=username).first()
         if user and user.check_password(password):
+            invalidar_usuario(user.id)  # próxima requisição carrega o retrato atualizado
             login_user(user)
             flash('Login realizado com sucesso!', 'success')
             return redirect('/')  # mantém na mesma aba
@@ -39,6 +40,8 @@ def login():
 @auth_bp.route('/logout')
 @login_required
 def logout():
+    revogar_tokens()
+    invalidar_usuario(current_user.id)
     logout_user()
     flash('Sessão encerrada.', 'info')
     return redirect(url_for('auth.login'))
@@ -60,8 +63,8 @@ def register():
         user = User(full_name=nome, email=email, role=setor, username=username)
         user.set_password(senha)
         db.session.add(user)
+        enviar_email_cadastro(email, username)  # só enfileira: sai junto com o commit do usuário
         db.session.commit()
 
-        enviar_email_cadastro(email, username)
         return render_template('register_success.html', username=username)
     return render_template('register.html')
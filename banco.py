@@ -0,0 +1,20 @@
+# banco.py
+from sqlalchemy import event
+from config import DB_PROFILES
+from models import db
+
+def aplicar_pragmas(pragmas):
+    def on_connect(dbapi_conn, _):
+        cur = dbapi_conn.cursor()
+        for nome, valor in pragmas.items():
+            cur.execute(f"PRAGMA {nome}={valor}")
+        cur.close()
+    return on_connect
+
+def configurar_engine(app):
+    """Registra os PRAGMAs do perfil DB_PROFILE para toda conexão nova do engine."""
+    pragmas = DB_PROFILES[app.config.get('DB_PROFILE', 'sqlite')]['pragmas']
+    if not pragmas or db.engine.dialect.name != 'sqlite':
+        return
+    event.listen(db.engine, 'connect', aplicar_pragmas(pragmas))
+    db.engine.dispose()  # conexões já abertas não passaram pelo evento
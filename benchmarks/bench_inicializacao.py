@@ -0,0 +1,60 @@
+# benchmarks/bench_inicializacao.py
+"""Mede a inicialização de um worker: import do app e create_app().
+
+Uso: python benchmarks/bench_inicializacao.py [repeticoes]   (padrão: 5)
+
+Cada repetição roda num processo Python novo (como um worker recém-criado),
+contra um SQLite temporário já migrado, e informa o tempo do `import app`, o
+tempo do create_app(), a memória residente ao final e se pandas/openpyxl foram
+carregados (não deveriam: só são importados quando uma importação roda).
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SCRIPT = r"""
+import json, sys, time
+sys.path.insert(0, %(raiz)r)
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+a = app.create_app()
+t2 = time.perf_counter()
+rss = 0
+try:
+    with open('/proc/self/status') as f:
+        rss = next(int(l.split()[1]) for l in f if l.startswith('VmRSS:')) / 1024
+except (OSError, StopIteration):
+    pass
+print(json.dumps({'import_s': t1 - t0, 'create_app_s': t2 - t1, 'rss_mb': rss,
+                  'pandas': 'pandas' in sys.modules, 'openpyxl': 'openpyxl' in sys.modules}))
+"""
+
+def rodar_uma(env):
+    saida = subprocess.run([sys.executable, '-c', SCRIPT % {'raiz': RAIZ}], env=env,
+                           capture_output=True, text=True, check=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+def main(repeticoes):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'),
+                   AGENDADOR_HABILITADO='0')
+        rodar_uma(env)  # cria o banco e aplica as migrações fora da medida
+        medidas = [rodar_uma(env) for _ in range(repeticoes)]
+
+    print(f"{'medida':>14} {'mediana':>9} {'mín':>9} {'máx':>9}")
+    for chave, unidade in (('import_s', 's'), ('create_app_s', 's'), ('rss_mb', 'MB')):
+        valores = [m[chave] for m in medidas]
+        print(f"{chave:>14} {statistics.median(valores):>8.3f}{unidade} "
+              f"{min(valores):>8.3f}{unidade} {max(valores):>8.3f}{unidade}")
+    print(f"pandas carregado: {any(m['pandas'] for m in medidas)}; "
+          f"openpyxl carregado: {any(m['openpyxl'] for m in medidas)}")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,71 @@
+# benchmarks/bench_upsert.py
+"""Mede o upsert em lote do importer contra um SQLite temporário.
+
+Uso: python benchmarks/bench_upsert.py [n1 n2 ...]
+
+Para cada tamanho roda uma importação inicial (tudo novo) e uma reimportação
+(tudo existente e inalterado), informando tempo, linhas/s e número de comandos SQL. O número
+de comandos deve ficar constante independente da quantidade de linhas.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import event
+from models import db
+from importer import upsert_item_status
+
+def criar_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+def gerar_registros(n, dias=30, clientes=40):
+    hoje = date.today()
+    return [{
+        'cliente': f"CLIENTE {i % clientes:03d}",
+        'modelo': f"MOD-{i:06d}",
+        'quantidade': (i * 7) % 500,
+        'status': 'Pronto' if i % 3 == 0 else 'Recebido',
+        'data': hoje - timedelta(days=i % dias),
+    } for i in range(n)]
+
+def medir(app, registros):
+    comandos = [0]
+    def contar(*args):
+        comandos[0] += 1
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', contar)
+        try:
+            inicio = time.perf_counter()
+            resumo = {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+            upsert_item_status(registros, resumo)
+            db.session.commit()
+            decorrido = time.perf_counter() - inicio
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', contar)
+    return decorrido, comandos[0], resumo
+
+def main(tamanhos):
+    print(f"{'linhas':>8} {'fase':>10} {'tempo(s)':>9} {'linhas/s':>10} {'SQL':>5}")
+    for n in tamanhos:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = criar_app(os.path.join(tmp, 'bench.db'))
+            with app.app_context():
+                db.create_all()
+            registros = gerar_registros(n)
+            for fase in ('inicial', 'reimport'):
+                t, sql, _ = medir(app, registros)
+                print(f"{n:>8} {fase:>10} {t:>9.3f} {n / t:>10.0f} {sql:>5}")
+            with app.app_context():
+                db.engine.dispose()
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [1000, 5000, 20000])
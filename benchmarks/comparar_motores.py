@@ -0,0 +1,82 @@
+# benchmarks/comparar_motores.py
+"""Confere que o motor 'layout' (openpyxl) lê a planilha igual ao importer_xlwings.
+
+Uso: python -m benchmarks.comparar_motores planilha.xlsm [outra.xlsm ...] [--aba NOME]
+
+Para cada planilha, lê pelos dois caminhos sem gravar no banco e compara as
+linhas normalizadas (data, cliente, modelo, quantidade, status por linha do
+Excel) e as linhas rejeitadas, mostrando o tempo de cada um. Precisa do Excel
+e do xlwings (Windows/macOS); sai com código 1 se alguma planilha divergir.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from importer import PLANILHA_ABA, abrir_leitor, normalizar_bloco  # noqa: E402
+
+def via_layout(path, aba):
+    """(linhas válidas por número da linha, erros) pelo motor 'layout'."""
+    from contextlib import ExitStack
+    erros, linhas = [], {}
+    with ExitStack() as pilha:
+        leitor, cols = abrir_leitor(pilha, path, aba, None, 'layout')
+        if cols is None:
+            return None, ["Colunas obrigatórias não encontradas"]
+        for numeros, bloco in leitor.blocos():
+            normalizado = normalizar_bloco(numeros, bloco, cols, erros)
+            linhas.update(zip(normalizado.index, normalizado.itertuples(index=False, name=None)))
+    return linhas, erros
+
+def via_xlwings(path, aba):
+    """(linhas válidas por número da linha, erros) pelo importer_xlwings."""
+    from importer_xlwings import ler_planilha_xlwings, colunas_xlwings
+    from normalizacao import normalizar_frame
+    df = ler_planilha_xlwings(path, aba)
+    cols = colunas_xlwings(df)
+    if cols is None:
+        return None, ["Colunas obrigatórias não encontradas"]
+    normalizado, invalidas = normalizar_frame(df, cols)
+    erros = [f"Linha {numero}: {erro}. Pulando." for numero, erro in invalidas.dropna().items()]
+    validas = normalizado[invalidas.isna()]
+    return dict(zip(validas.index, validas.itertuples(index=False, name=None))), erros
+
+def comparar(path, aba):
+    inicio = time.perf_counter()
+    layout, erros_layout = via_layout(path, aba)
+    t_layout = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    xlwings, erros_xlwings = via_xlwings(path, aba)
+    t_xlwings = time.perf_counter() - inicio
+
+    print(f"{os.path.basename(path)}: layout {t_layout:.2f}s, xlwings {t_xlwings:.2f}s, "
+          f"{len(layout or {})} linhas válidas")
+    divergencias = []
+    if (layout is None) != (xlwings is None):
+        divergencias.append("só um dos motores encontrou as colunas")
+    for numero in sorted(set(layout or {}) | set(xlwings or {})):
+        a, b = (layout or {}).get(numero), (xlwings or {}).get(numero)
+        if a != b:
+            divergencias.append(f"linha {numero}: layout={a} xlwings={b}")
+    if erros_layout != erros_xlwings:
+        divergencias.append(f"erros diferentes: layout={erros_layout[:5]} xlwings={erros_xlwings[:5]}")
+    for d in divergencias[:20]:
+        print(f"  {d}")
+    return not divergencias
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara o motor layout com o importer_xlwings.')
+    parser.add_argument('planilhas', nargs='+')
+    parser.add_argument('--aba', default=PLANILHA_ABA)
+    args = parser.parse_args()
+    if importlib.util.find_spec('xlwings') is None:
+        sys.exit("xlwings não está instalado (precisa do Excel): nada a comparar.")
+    iguais = [comparar(p, args.aba) for p in args.planilhas]
+    print(f"{sum(iguais)}/{len(iguais)} planilha(s) idênticas")
+    sys.exit(0 if all(iguais) else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/gerar_planilha.py
+"""Gera planilhas sintéticas no formato da Plan-VenttosLogistica.
+
+Uso: python benchmarks/gerar_planilha.py [linhas] [destino.xlsx] [--semente N]
+
+Mesmo layout da planilha real: título nas primeiras linhas, cabeçalho em B6:H6
+e dados a partir da linha 7. Os valores imitam o que aparece na produção:
+datas dd/mm/aaaa em texto (e algumas como data do Excel), quantidades com
+decimal brasileiro ("1.234,5"), células em branco e linhas repetidas.
+"""
+import argparse
+import os
+import random
+from datetime import date, timedelta
+from openpyxl import Workbook
+
+ABA = 'Plan-VenttosLogistica'
+LINHA_CABECALHO = 6
+CABECALHO = ['Data', 'Cliente', 'Modelo', 'Quantidade', 'Pronto', 'Linha', 'Observação']
+
+PROPORCAO_DUPLICADAS = 0.02
+PROPORCAO_EM_BRANCO = 0.01
+
+def _quantidade(rnd):
+    valor = rnd.randint(1, 25000)
+    sorteio = rnd.random()
+    if sorteio < 0.5:
+        return valor  # número
+    if sorteio < 0.8:
+        return f"{valor:,}".replace(',', '.')  # "12.345"
+    return f"{valor:,}".replace(',', '.') + ',5'  # "12.345,5"
+
+def linhas_sinteticas(n, semente=42, dias=30, clientes=40, inicio=date(2024, 1, 1)):
+    """Gera n linhas de dados (listas na ordem de CABECALHO)."""
+    rnd = random.Random(semente)
+    geradas = []
+    for i in range(n):
+        if geradas and rnd.random() < PROPORCAO_DUPLICADAS:
+            linha = list(rnd.choice(geradas[-1000:]))  # mesma data e modelo de uma linha recente
+            linha[3] = _quantidade(rnd)
+        else:
+            dia = inicio + timedelta(days=i % dias)
+            linha = [
+                dia if rnd.random() < 0.1 else dia.strftime('%d/%m/%Y'),
+                f"CLIENTE {rnd.randrange(clientes):03d}",
+                f"MOD-{i:07d}",
+                _quantidade(rnd),
+                rnd.choice(['Sim', 'sim', 'OK', 'Não', '', None]),
+                f"L{rnd.randint(1, 12)}",
+                None if rnd.random() < 0.7 else 'conferir embalagem',
+            ]
+        if rnd.random() < PROPORCAO_EM_BRANCO:
+            linha[rnd.choice([1, 3, 4, 6])] = None
+        geradas.append(linha)
+        yield linha
+
+def gerar_planilha(destino, n, semente=42, **kwargs):
+    """Grava a planilha com n linhas de dados em `destino` (modo write-only) e retorna o caminho."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(ABA)
+    ws.append(['PCP - Venttos Manaus'])
+    for _ in range(LINHA_CABECALHO - 2):
+        ws.append([])
+    ws.append([None] + CABECALHO)  # começa na coluna B
+    for linha in linhas_sinteticas(n, semente, **kwargs):
+        ws.append([None] + linha)
+    wb.save(destino)
+    return destino
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera uma planilha PCP sintética.')
+    parser.add_argument('linhas', type=int, nargs='?', default=1000)
+    parser.add_argument('destino', nargs='?')
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+    destino = args.destino or os.path.abspath(f'pcp_sintetica_{args.linhas}.xlsx')
+    print(gerar_planilha(destino, args.linhas, args.semente))
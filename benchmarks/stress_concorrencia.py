@@ -0,0 +1,104 @@
+# benchmarks/stress_concorrencia.py
+"""Leitores do painel durante uma importação longa, por perfil de engine.
+
+Uso: python benchmarks/stress_concorrencia.py [perfil ...]   (padrão: sqlite_padrao sqlite)
+
+Uma thread simula a importação: abre a transação, grava ItemStatus em lote e
+segura a transação aberta por alguns segundos antes do commit. Enquanto isso,
+várias threads leem o painel de uma data (como o dashboard) e medem latência
+e erros. Com o perfil 'sqlite' (WAL) os leitores não devem ficar bloqueados.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import select
+from config import DB_PROFILES
+from models import db, ItemStatus
+from banco import configurar_engine
+from importer import upsert_item_status
+from migracoes import aplicar_migracoes
+
+LEITORES = 8
+SEGURAR_TRANSACAO = 3.0
+
+def criar_app(db_path, perfil):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = DB_PROFILES[perfil]['engine_options']
+    app.config['DB_PROFILE'] = perfil
+    db.init_app(app)
+    with app.app_context():
+        configurar_engine(app)
+    return app
+
+def registros(n, inicio=0):
+    hoje = date.today()
+    return [{
+        'cliente': f"CLIENTE {i % 20:02d}", 'modelo': f"MOD-{i:06d}", 'quantidade': i % 300,
+        'status': 'Recebido', 'data': hoje - timedelta(days=i % 10),
+    } for i in range(inicio, inicio + n)]
+
+def importacao(app, pronto):
+    with app.app_context():
+        resumo = {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+        upsert_item_status(registros(20000, 20000), resumo)
+        pronto.set()
+        time.sleep(SEGURAR_TRANSACAO)
+        db.session.commit()
+
+def leitor(app, fim, latencias, erros):
+    with app.app_context():
+        while not fim.is_set():
+            inicio = time.perf_counter()
+            try:
+                db.session.execute(select(ItemStatus.modelo, ItemStatus.status)
+                                   .where(ItemStatus.data == date.today())).all()
+                latencias.append(time.perf_counter() - inicio)
+            except Exception as e:
+                erros.append(str(e).splitlines()[0])
+            finally:
+                db.session.remove()
+
+def rodar(perfil):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = criar_app(os.path.join(tmp, 'stress.db'), perfil)
+        with app.app_context():
+            aplicar_migracoes()
+            resumo = {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+            upsert_item_status(registros(20000), resumo)
+            db.session.commit()
+
+        pronto, fim = threading.Event(), threading.Event()
+        latencias, erros = [], []
+        escritor = threading.Thread(target=importacao, args=(app, pronto))
+        escritor.start()
+        pronto.wait()
+        threads = [threading.Thread(target=leitor, args=(app, fim, latencias, erros)) for _ in range(LEITORES)]
+        for t in threads:
+            t.start()
+        escritor.join()
+        fim.set()
+        for t in threads:
+            t.join()
+        with app.app_context():
+            db.engine.dispose()
+
+    latencias.sort()
+    p99 = latencias[int(len(latencias) * 0.99)] * 1000 if latencias else float('nan')
+    maxima = latencias[-1] * 1000 if latencias else float('nan')
+    print(f"{perfil:>14} {len(latencias):>8} {p99:>9.1f} {maxima:>9.1f} {len(erros):>6}")
+    if erros:
+        print(f"{'':>14} ex.: {erros[0]}")
+
+if __name__ == '__main__':
+    print(f"{'perfil':>14} {'leituras':>8} {'p99(ms)':>9} {'max(ms)':>9} {'erros':>6}")
+    for perfil in sys.argv[1:] or ['sqlite_padrao', 'sqlite']:
+        rodar(perfil)
@@ -0,0 +1,225 @@
+# benchmarks/suite.py
+"""Suíte de desempenho dos caminhos principais contra um SQLite temporário.
+
+Uso: python -m benchmarks.suite [tamanhos ...] [--salvar ARQ.json] [--comparar ARQ.json]
+                                [--tolerancia 0.2]
+
+Para cada tamanho (padrão: 1000 10000) gera uma planilha sintética
+(benchmarks/gerar_planilha.py) e mede:
+
+- importacao: importar_planilha da planilha nova;
+- reimport_arquivo: a mesma planilha de novo (arquivo inalterado, pulado pela assinatura);
+- reimport_linhas: a mesma planilha com forcar=True (todas as linhas sem alteração);
+- reimport_layout: de novo com o motor 'layout' (B6:H com ffill, sem xlwings);
+- dashboard: GET / de cada data (primeira montagem e com o payload em cache);
+- status: POST /update_status item a item e POST /bulk_update_status em lote.
+
+Cada medida traz tempo, itens/s e pico de memória do processo. --salvar grava
+os resultados em JSON; --comparar lê um JSON anterior e aponta as medidas que
+ficaram mais lentas que a tolerância (sai com código 1 se houver alguma).
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# o banco temporário precisa estar definido antes de config.py ser importado
+TMP = tempfile.mkdtemp(prefix='bench_pcp_')
+atexit.register(shutil.rmtree, TMP, True)
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TMP, 'bench.db')
+os.environ['AGENDADOR_HABILITADO'] = '0'  # sem importação periódica durante as medidas
+
+from sqlalchemy import select, delete  # noqa: E402
+from benchmarks.gerar_planilha import gerar_planilha, ABA, LINHA_CABECALHO  # noqa: E402
+
+USUARIO, SENHA = 'bench', 'bench'
+
+# ==========================
+# Memória
+# ==========================
+def _zerar_pico():
+    """Zera o pico de memória do processo (Linux); em outros sistemas o pico só cresce."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def _pico_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+def medir(nome, itens, fn):
+    """Executa fn() e retorna a medida {'nome', 'segundos', 'itens', 'itens_s', 'pico_mb'}."""
+    _zerar_pico()
+    inicio = time.perf_counter()
+    fn()
+    segundos = time.perf_counter() - inicio
+    medida = {
+        'nome': nome,
+        'segundos': round(segundos, 4),
+        'itens': itens,
+        'itens_s': round(itens / segundos, 1) if segundos else None,
+        'pico_mb': round(_pico_mb(), 1),
+    }
+    print(f"{nome:>28} {segundos:>9.3f}s {medida['itens_s'] or 0:>12.0f}/s {medida['pico_mb']:>8.1f} MB")
+    return medida
+
+# ==========================
+# Aplicação
+# ==========================
+def criar_app():
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    from models import db, User
+    with app.app_context():
+        if not User.query.filter_by(username=USUARIO).first():
+            u = User(full_name='Benchmark', username=USUARIO, role='admin')
+            u.set_password(SENHA)
+            db.session.add(u)
+            db.session.commit()
+    return app
+
+def limpar_banco(app):
+    from models import db, ItemStatus, ItemHistory, ArquivoImportado, ContadorVersao, ResumoDiario, LeadTimeDiario
+    with app.app_context():
+        for modelo in (ItemHistory, ItemStatus, ArquivoImportado, ContadorVersao, ResumoDiario, LeadTimeDiario):
+            db.session.execute(delete(modelo))
+        db.session.commit()
+
+def cliente_logado(app):
+    cliente = app.test_client()
+    resp = cliente.post('/auth/login', data={'username': USUARIO, 'password': SENHA})
+    if resp.status_code != 302:
+        raise RuntimeError(f"Login falhou: {resp.status_code}")
+    return cliente
+
+# ==========================
+# Cenários
+# ==========================
+def rodar(app, n):
+    from models import db, ItemStatus
+    from importer import importar_planilha
+    import dashboard_cache
+
+    caminho = os.path.join(TMP, f'pcp_{n}.xlsx')
+    print(f"\n== {n} linhas ==")
+    medidas = [medir('gerar_planilha', n, lambda: gerar_planilha(caminho, n))]
+    limpar_banco(app)
+
+    def importar(**kwargs):
+        with app.app_context():
+            resumo = importar_planilha(caminho, ABA, linha_cabecalho=LINHA_CABECALHO, **kwargs)
+            if resumo['errors'] and not (resumo['created'] or resumo['updated'] or resumo['unchanged']
+                                         or resumo.get('arquivo_inalterado')):
+                raise RuntimeError(resumo['errors'][:3])
+
+    medidas.append(medir('importacao', n, importar))
+    medidas.append(medir('reimport_arquivo', n, importar))
+    medidas.append(medir('reimport_linhas', n, lambda: importar(forcar=True)))
+    medidas.append(medir('reimport_layout', n, lambda: importar(forcar=True, motor='layout')))
+
+    with app.app_context():
+        datas = db.session.execute(select(ItemStatus.data).distinct().order_by(ItemStatus.data)).scalars().all()
+        modelos = db.session.execute(
+            select(ItemStatus.modelo).where(ItemStatus.data == datas[0]).order_by(ItemStatus.modelo).limit(200)
+        ).scalars().all()
+
+    cliente = cliente_logado(app)
+    def dashboard():
+        for d in datas:
+            resp = cliente.get(f'/?data={d.isoformat()}')
+            if resp.status_code != 200:
+                raise RuntimeError(f"GET / falhou: {resp.status_code}")
+    dashboard_cache._cache.clear()
+    medidas.append(medir('dashboard_primeira_montagem', len(datas), dashboard))
+    medidas.append(medir('dashboard_em_cache', len(datas), dashboard))
+
+    # a senha é conferida uma vez; as demais alterações usam o token de confirmação
+    token = cliente.post('/update_status', json={
+        'modelo': modelos[0], 'status': 'Pronto', 'data': datas[0].isoformat(), 'senha': SENHA,
+    }).get_json()['token']
+    def status_individual():
+        for m in modelos[:50]:
+            resp = cliente.post('/update_status', json={
+                'modelo': m, 'status': 'Notas sendo faturadas', 'data': datas[0].isoformat(), 'token': token,
+            }).get_json()
+            if not resp['success']:
+                raise RuntimeError(resp['msg'])
+    def status_lote():
+        resp = cliente.post('/bulk_update_status', json={
+            'modelos': modelos, 'status': 'Faturamento confirmado', 'data': datas[0].isoformat(), 'token': token,
+        }).get_json()
+        if not resp['success']:
+            raise RuntimeError(resp['msg'])
+    medidas.append(medir('status_individual', len(modelos[:50]), status_individual))
+    medidas.append(medir('status_lote', len(modelos), status_lote))
+    return medidas
+
+# ==========================
+# Linha de base
+# ==========================
+def comparar(resultados, anterior, tolerancia):
+    """Lista as medidas mais lentas que a linha de base além da tolerância."""
+    base = {(r['linhas'], m['nome']): m for r in anterior['resultados'] for m in r['medidas']}
+    regressoes = []
+    print(f"\n{'linhas':>8} {'medida':>28} {'base(s)':>9} {'atual(s)':>9} {'variação':>9}")
+    for r in resultados:
+        for m in r['medidas']:
+            b = base.get((r['linhas'], m['nome']))
+            if not b or not b['segundos']:
+                continue
+            variacao = m['segundos'] / b['segundos'] - 1
+            marca = ' <- regressão' if variacao > tolerancia else ''
+            print(f"{r['linhas']:>8} {m['nome']:>28} {b['segundos']:>9.3f} {m['segundos']:>9.3f} {variacao:>+8.0%}{marca}")
+            if marca:
+                regressoes.append((r['linhas'], m['nome'], variacao))
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do Sistema de Logística PCP.')
+    parser.add_argument('tamanhos', type=int, nargs='*', default=[1000, 10000])
+    parser.add_argument('--salvar', help='grava os resultados neste JSON')
+    parser.add_argument('--comparar', help='compara com um JSON salvo antes')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='variação aceita (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    app = criar_app()
+    print(f"{'medida':>28} {'tempo':>10} {'itens/s':>14} {'pico':>11}")
+    resultados = [{'linhas': n, 'medidas': rodar(app, n)} for n in args.tamanhos]
+    saida = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'resultados': resultados,
+    }
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as f:
+            json.dump(saida, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados gravados em {args.salvar}")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} medida(s) acima da tolerância de {args.tolerancia:.0%}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+# cache_clientes.py
+"""Cache de referência dos clientes, compartilhado pelas importações.
+
+Os clientes são identificados por uma chave normalizada (sem acentos, sem
+diferença de maiúsculas e com espaços simples, como em auth_routes.make_username):
+"ACME", "Acme " e "ACMÉ" são o mesmo cliente, gravado com a grafia vista
+primeiro. O cache guarda chave -> (id, nome) com no máximo MAX_CLIENTES
+entradas e é aquecido com uma consulta só.
+
+Os processos se sincronizam pelo contador 'referencia:clientes' da tabela
+contador_versao: alterar ou excluir um Cliente incrementa a versão na mesma
+transação, e cada chamada de resolver_clientes() compara a versão (uma consulta
+pela chave primária) antes de usar o cache. Clientes novos não mudam a versão:
+quem não os conhece busca pela chave no banco na primeira vez que aparecem.
+
+Clientes criados ou lidos durante uma transação ainda aberta ficam na sessão
+(session.info) e só entram no cache depois do commit; um rollback os descarta,
+e o cache nunca guarda um id que não chegou ao banco.
+"""
+import re
+import threading
+import unicodedata
+from collections import namedtuple, OrderedDict
+from functools import lru_cache
+from sqlalchemy import event, select, insert, update
+from sqlalchemy.orm import Session
+from models import db, Cliente, ContadorVersao
+
+MAX_CLIENTES = 20000
+CHAVE_VERSAO = 'referencia:clientes'
+
+ClienteRef = namedtuple('ClienteRef', 'id nome')
+
+_cache = OrderedDict()  # chave -> ClienteRef
+_versao = None          # versão do banco que o cache reflete
+_lock = threading.Lock()
+
+@lru_cache(maxsize=8192)
+def chave_cliente(nome):
+    """Chave de comparação: sem acentos, casefold e espaços internos reduzidos a um."""
+    texto = unicodedata.normalize('NFKD', nome or '').encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\s+', ' ', texto).strip().casefold()
+
+# ==========================
+# Versão (invalidação entre processos)
+# ==========================
+def versao_clientes():
+    versao = db.session.execute(
+        select(ContadorVersao.versao).where(ContadorVersao.chave == CHAVE_VERSAO)
+    ).scalar()
+    return versao or 0
+
+def _incrementar_versao(conn):
+    result = conn.execute(
+        update(ContadorVersao).where(ContadorVersao.chave == CHAVE_VERSAO)
+        .values(versao=ContadorVersao.versao + 1)
+    )
+    if result.rowcount == 0:
+        conn.execute(insert(ContadorVersao).values(chave=CHAVE_VERSAO, versao=1))
+
+def invalidar_clientes():
+    """Para alterações em Cliente feitas por SQL em lote (sem eventos do ORM). Sem commit."""
+    _incrementar_versao(db.session.connection())
+    limpar_cache()
+
+def limpar_cache():
+    global _versao
+    with _lock:
+        _cache.clear()
+        _versao = None
+
+@event.listens_for(Cliente, 'before_insert')
+@event.listens_for(Cliente, 'before_update')
+def _preencher_chave(mapper, connection, target):
+    target.chave = chave_cliente(target.nome)
+
+@event.listens_for(Cliente, 'after_update')
+@event.listens_for(Cliente, 'after_delete')
+def _invalidar_ao_alterar(mapper, connection, target):
+    _incrementar_versao(connection)
+    limpar_cache()
+
+# ==========================
+# Refs da transação em andamento
+# ==========================
+def _da_transacao(session=None):
+    """{chave: ClienteRef} lidos ou criados na transação atual (entram no cache após o commit)."""
+    session = session or db.session()
+    return session.info.setdefault('clientes_pendentes', {})
+
+@event.listens_for(Session, 'after_commit')
+def _guardar_apos_commit(session):
+    refs = session.info.pop('clientes_pendentes', None)
+    if refs:
+        with _lock:
+            _guardar(refs)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_pendentes(session, transacao_anterior):
+    if transacao_anterior.parent is None:  # só a transação externa; savepoints não contam
+        session.info.pop('clientes_pendentes', None)
+
+# ==========================
+# Consulta
+# ==========================
+def _guardar(refs):
+    """refs: {chave: ClienteRef}. Chamar com _lock."""
+    for chave, ref in refs.items():
+        _cache[chave] = ref
+        _cache.move_to_end(chave)
+    while len(_cache) > MAX_CLIENTES:
+        _cache.popitem(last=False)
+
+def _aquecer(versao):
+    global _versao
+    linhas = db.session.execute(
+        select(Cliente.chave, Cliente.id, Cliente.nome).order_by(Cliente.id.desc()).limit(MAX_CLIENTES)
+    ).all()
+    pendentes = _da_transacao()  # ainda não confirmados: ficam fora do cache
+    with _lock:
+        _cache.clear()
+        _guardar({chave: ClienteRef(id_, nome) for chave, id_, nome in reversed(linhas)
+                  if chave and chave not in pendentes})
+        _versao = versao
+
+def _insert_ignorando_existentes():
+    """INSERT ... ON CONFLICT DO NOTHING no dialeto do banco (SQLite ou PostgreSQL)."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_dialeto
+    else:
+        from sqlalchemy.dialects.sqlite import insert as insert_dialeto
+    return insert_dialeto(Cliente).on_conflict_do_nothing()
+
+def _buscar(chaves):
+    return {chave: ClienteRef(id_, nome) for chave, id_, nome in db.session.execute(
+        select(Cliente.chave, Cliente.id, Cliente.nome).where(Cliente.chave.in_(chaves))
+    )}
+
+def resolver_clientes(nomes):
+    """Retorna {nome: ClienteRef(id, nome gravado)} criando os clientes que faltam. Sem commit.
+
+    Uma consulta da versão; o banco só é lido de novo para chaves fora do cache
+    e, se faltar algum cliente, mais um INSERT em lote. O que foi lido do banco
+    nesta transação só vai para o cache compartilhado depois do commit.
+    """
+    por_nome = {n: chave_cliente(n) for n in dict.fromkeys(nomes)}  # mantém a ordem de chegada
+    if not por_nome:
+        return {}
+
+    versao = versao_clientes()
+    if versao != _versao:
+        _aquecer(versao)
+    pendentes = _da_transacao()
+    encontrados = {c: pendentes[c] for c in set(por_nome.values()) if c in pendentes}
+    with _lock:
+        for c in set(por_nome.values()) - set(encontrados):
+            if c in _cache:
+                encontrados[c] = _cache[c]
+                _cache.move_to_end(c)
+
+    faltando = set(por_nome.values()) - set(encontrados)
+    if faltando:
+        lidos = _buscar(faltando)
+        faltando -= set(lidos)
+        if faltando:
+            novos = {}
+            for nome, chave in por_nome.items():
+                if chave in faltando:
+                    novos.setdefault(chave, nome)  # grafia vista primeiro
+            # quem já existe (criado por outro processo ao mesmo tempo) é ignorado e relido abaixo
+            db.session.execute(_insert_ignorando_existentes(),
+                               [{'nome': n, 'chave': c} for c, n in novos.items()])
+            lidos.update(_buscar(faltando))
+            faltando -= set(lidos)
+        if faltando:
+            raise RuntimeError(f"Não foi possível cadastrar os clientes: {sorted(faltando)[:5]}")
+        pendentes.update(lidos)
+        encontrados.update(lidos)
+    return {nome: encontrados[chave] for nome, chave in por_nome.items()}
@@ -0,0 +1,211 @@
+# cache_uploads.py
+"""Uploads de planilha PCP guardados pelo conteúdo, com cache das colunas já lidas.
+
+O arquivo enviado é gravado como <sha256>.<ext> na pasta de uploads: envios com
+o mesmo nome não se sobrescrevem mais e o mesmo conteúdo enviado de novo
+reaproveita o que já existe. Na primeira leitura, cada coluna da planilha é
+normalizada como texto, quantidade e "pronto" (normalizacao.py) e gravada num
+.npz ao lado do upload. O preview e a confirmação leem só o .npz, e um reenvio
+do mesmo arquivo não abre o Excel de novo.
+
+Quando a pasta passa do limite configurado, os uploads usados há mais tempo
+(arquivo e cache juntos) são removidos; cada uso atualiza o mtime dos arquivos.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from leitor_planilha import LeitorPlanilha
+
+VERSAO_CACHE = 1      # muda quando o conteúdo do .npz muda; caches antigos são refeitos
+LINHAS_PREVIEW = 10
+BLOCO_GRAVACAO = 64 * 1024
+SUFIXO_CACHE = '.npz'
+SUFIXO_PARCIAL = '.parcial'
+NOME_UPLOAD = re.compile(r'[0-9a-f]{64}')  # sha256 do conteúdo
+
+# ==========================
+# Gravação do upload
+# ==========================
+def salvar_upload(arquivo, pasta):
+    """Grava o FileStorage `arquivo` em `pasta` como <sha256>.<ext> e retorna esse nome."""
+    ext = arquivo.filename.rsplit('.', 1)[-1].lower()
+    os.makedirs(pasta, exist_ok=True)
+    sha = hashlib.sha256()
+    fd, parcial = tempfile.mkstemp(dir=pasta, suffix=SUFIXO_PARCIAL)
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            for bloco in iter(lambda: arquivo.stream.read(BLOCO_GRAVACAO), b''):
+                sha.update(bloco)
+                destino.write(bloco)
+        nome = f"{sha.hexdigest()}.{ext}"
+        caminho = os.path.join(pasta, nome)
+        if os.path.exists(caminho):
+            os.remove(parcial)  # mesmo conteúdo já enviado antes
+            _tocar(caminho)
+        else:
+            os.replace(parcial, caminho)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+    return nome
+
+def _tocar(*caminhos):
+    for caminho in caminhos:
+        try:
+            os.utime(caminho)
+        except OSError:
+            pass
+
+# ==========================
+# Cache das colunas
+# ==========================
+def _construir_cache(caminho, destino):
+    """Lê a planilha uma vez e grava o .npz com as colunas normalizadas."""
+    import numpy as np
+    import pandas as pd
+    from normalizacao import normalizar_texto, normalizar_quantidade, normalizar_pronto
+
+    with LeitorPlanilha(caminho) as leitor:
+        colunas = leitor.colunas
+        partes = {i: ([], [], []) for i in range(len(colunas))}
+        preview = []
+        linhas_lidas = 0
+        for _, linhas in leitor.blocos():
+            if len(preview) < LINHAS_PREVIEW:
+                preview.extend(['' if v is None else str(v) for v in linha]
+                               for linha in linhas[:LINHAS_PREVIEW - len(preview)])
+            df = pd.DataFrame(linhas, columns=range(len(colunas)))
+            for i, (textos, quantidades, prontos) in partes.items():
+                textos.append(normalizar_texto(df[i]).to_numpy(dtype=str))
+                quantidades.append(normalizar_quantidade(df[i])[0].to_numpy())
+                prontos.append(normalizar_pronto(df[i]).to_numpy(dtype=bool))
+            linhas_lidas += len(linhas)
+
+    arrays = {
+        'versao': np.array(VERSAO_CACHE),
+        'linhas': np.array(linhas_lidas),
+        'colunas': np.array(colunas, dtype=str),
+        'preview': np.array(preview, dtype=str).reshape(len(preview), len(colunas)),
+    }
+    juntar = lambda lista, dtype: np.concatenate(lista) if lista else np.array([], dtype=dtype)
+    for i, (textos, quantidades, prontos) in partes.items():
+        arrays[f'texto_{i}'] = juntar(textos, str)
+        arrays[f'quantidade_{i}'] = juntar(quantidades, 'int64')
+        arrays[f'pronto_{i}'] = juntar(prontos, bool)
+
+    # grava num temporário e troca: outro processo nunca lê um .npz pela metade
+    fd, parcial = tempfile.mkstemp(dir=os.path.dirname(destino) or '.', suffix=SUFIXO_PARCIAL)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(parcial, destino)
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+
+class TabelaUpload:
+    """Colunas normalizadas de um upload, lidas do cache (criado na primeira vez).
+
+        with TabelaUpload(caminho, limite_bytes) as tabela:
+            tabela.colunas, tabela.linhas, tabela.preview()
+            tabela.texto(i), tabela.quantidade(i), tabela.pronto(i)
+
+    Os arrays de cada coluna só são descompactados quando pedidos. Com
+    `limite_bytes`, criar um cache novo dispara liberar_espaco na pasta.
+    """
+
+    def __init__(self, caminho, limite_bytes=None):
+        self.caminho = caminho
+        self.cache = caminho + SUFIXO_CACHE
+        self.limite_bytes = limite_bytes
+        self.colunas = []
+        self.linhas = 0
+        self._npz = None
+
+    def __enter__(self):
+        import numpy as np
+        if not os.path.exists(self.caminho):
+            raise FileNotFoundError(f"Arquivo do upload não está mais disponível: {os.path.basename(self.caminho)}")
+        self._npz = self._abrir(np) if os.path.exists(self.cache) else None
+        if self._npz is None:
+            _construir_cache(self.caminho, self.cache)
+            self._npz = np.load(self.cache)
+            if self.limite_bytes:
+                liberar_espaco(os.path.dirname(self.caminho), self.limite_bytes, manter=self.caminho)
+        _tocar(self.caminho, self.cache)
+        self.colunas = self._npz['colunas'].tolist()
+        self.linhas = int(self._npz['linhas'])
+        return self
+
+    def _abrir(self, np):
+        """Abre o cache existente; None se estiver corrompido ou for de outra versão."""
+        try:
+            npz = np.load(self.cache)
+            if int(npz['versao']) == VERSAO_CACHE:
+                return npz
+            npz.close()
+        except Exception:
+            pass
+        return None
+
+    def __exit__(self, *exc):
+        if self._npz is not None:
+            self._npz.close()
+            self._npz = None
+        return False
+
+    def preview(self, n=LINHAS_PREVIEW):
+        """Primeiras `n` linhas (até LINHAS_PREVIEW) como dicts coluna -> texto da célula."""
+        return [dict(zip(self.colunas, linha)) for linha in self._npz['preview'][:n].tolist()]
+
+    def texto(self, i):
+        return self._npz[f'texto_{i}']
+
+    def quantidade(self, i):
+        return self._npz[f'quantidade_{i}']
+
+    def pronto(self, i):
+        return self._npz[f'pronto_{i}']
+
+# ==========================
+# Remoção dos menos usados
+# ==========================
+def liberar_espaco(pasta, limite_bytes, manter=None):
+    """Remove os uploads (com seus caches) usados há mais tempo até a pasta caber em `limite_bytes`.
+
+    Só conta e remove arquivos gravados por salvar_upload (<sha256>.<ext> e o
+    cache ao lado): uploads antigos com o nome original e outros arquivos da
+    pasta ficam. `manter` (caminho de um upload) nunca é removido. Retorna
+    quantos uploads saíram.
+    """
+    entradas = {}  # chave do upload -> [bytes, último uso, arquivos]
+    with os.scandir(pasta) as it:
+        for arq in it:
+            chave = arq.name.split('.', 1)[0]
+            if not arq.is_file() or arq.name.endswith(SUFIXO_PARCIAL) or not NOME_UPLOAD.fullmatch(chave):
+                continue
+            info = arq.stat()
+            entrada = entradas.setdefault(chave, [0, 0.0, []])
+            entrada[0] += info.st_size
+            entrada[1] = max(entrada[1], info.st_mtime)
+            entrada[2].append(arq.path)
+
+    total = sum(e[0] for e in entradas.values())
+    chave_mantida = os.path.basename(manter).split('.', 1)[0] if manter else None
+    removidos = 0
+    for chave, (tamanho, _, arquivos) in sorted(entradas.items(), key=lambda kv: kv[1][1]):
+        if total <= limite_bytes:
+            break
+        if chave == chave_mantida:
+            continue
+        for caminho in arquivos:
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+        total -= tamanho
+        removidos += 1
+    return removidos
@@ -0,0 +1,95 @@
+# cache_usuarios.py
+"""Cache do usuário logado para o user_loader do Flask-Login.
+
+Guarda por id um retrato imutável do usuário (id, username, role, ...), sem
+vínculo com a sessão do SQLAlchemy. Assim as requisições autenticadas (polls do
+painel, AJAX) não carregam o User da tabela user.
+
+Cada usuário tem um contador 'usuario:<id>' na tabela contador_versao, que
+alterar ou excluir o User incrementa na mesma transação (como no
+dashboard_cache). O retrato guarda a versão em que foi lido, e cada carga
+compara com a do banco (uma consulta pela chave primária): troca de senha ou de
+papel vale na hora em todos os processos. USER_CACHE_TTL_SECONDS limita a vida
+de cada entrada, para alterações feitas por SQL direto, sem eventos do ORM.
+"""
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, select, update, insert
+from models import db, User, ContadorVersao
+
+MAX_USUARIOS = 1024
+
+_cache = OrderedDict()  # id -> (expira_em, snapshot)
+_lock = threading.Lock()
+
+class UsuarioSnapshot(namedtuple('UsuarioSnapshot', 'id username full_name email role versao'), UserMixin):
+    """Retrato somente leitura de um User, compatível com o Flask-Login."""
+    __slots__ = ()
+
+    @classmethod
+    def de_usuario(cls, user, versao):
+        return cls(user.id, user.username, user.full_name, user.email, user.role, versao)
+
+    def check_password(self, password):
+        # só a verificação de senha precisa do hash: busca o User nesse momento
+        user = db.session.get(User, self.id)
+        return bool(user) and user.check_password(password)
+
+# ==========================
+# Versão (invalidação entre processos)
+# ==========================
+def _chave(user_id):
+    return f"usuario:{user_id}"
+
+def versao_usuario(user_id):
+    versao = db.session.execute(
+        select(ContadorVersao.versao).where(ContadorVersao.chave == _chave(user_id))
+    ).scalar()
+    return versao or 0
+
+def _incrementar_versao(conn, user_id):
+    result = conn.execute(
+        update(ContadorVersao).where(ContadorVersao.chave == _chave(user_id))
+        .values(versao=ContadorVersao.versao + 1)
+    )
+    if result.rowcount == 0:
+        conn.execute(insert(ContadorVersao).values(chave=_chave(user_id), versao=1))
+
+# ==========================
+# Consulta
+# ==========================
+def carregar_usuario(user_id):
+    """user_loader: retorna o snapshot em cache se a versão do usuário não mudou, senão lê o banco."""
+    agora = time.monotonic()
+    versao = versao_usuario(user_id)
+    with _lock:
+        entrada = _cache.get(user_id)
+        if entrada and entrada[0] > agora and entrada[1].versao == versao:
+            _cache.move_to_end(user_id)
+            return entrada[1]
+
+    user = db.session.get(User, user_id)
+    if not user:
+        invalidar_usuario(user_id)
+        return None
+    snapshot = UsuarioSnapshot.de_usuario(user, versao)
+    ttl = current_app.config.get('USER_CACHE_TTL_SECONDS', 60)
+    with _lock:
+        _cache[user_id] = (agora + ttl, snapshot)
+        _cache.move_to_end(user_id)
+        while len(_cache) > MAX_USUARIOS:
+            _cache.popitem(last=False)
+    return snapshot
+
+def invalidar_usuario(user_id):
+    with _lock:
+        _cache.pop(user_id, None)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidar_ao_alterar(mapper, connection, target):
+    _incrementar_versao(connection, target.id)
+    invalidar_usuario(target.id)
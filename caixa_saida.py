@@ -0,0 +1,206 @@
+# caixa_saida.py
+"""Caixa de saída de e-mails: as rotas só enfileiram, uma thread envia em lotes.
+
+enfileirar_email() grava a mensagem em email_saida na transação de quem chama
+e, depois do commit, acorda a thread de envio do processo. A thread reserva até
+EMAIL_LOTE mensagens com um UPDATE condicional com prazo (dois workers nunca
+pegam a mesma), abre uma única conexão SMTP para o lote e marca cada mensagem
+como enviada ou a reagenda com espera exponencial (EMAIL_ESPERA_BASE_SEGUNDOS,
+dobrando a cada tentativa até EMAIL_ESPERA_MAX_SEGUNDOS). Depois de
+EMAIL_MAX_TENTATIVAS, ou se o servidor recusar o destinatário, a mensagem fica
+como 'falhou'. Reservas vencidas (processo morto no meio do lote) voltam à fila.
+
+Para testar com um SMTP local, ex.: `python -m aiosmtpd -n -l localhost:8025` e
+MAIL_SERVER=localhost MAIL_PORT=8025 MAIL_USE_TLS=0 python caixa_saida.py
+(envia o que estiver pendente e mostra o resultado).
+"""
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from flask import current_app
+from sqlalchemy import and_, event, or_, select, update
+from sqlalchemy.orm import Session
+from models import db, EmailSaida
+from agendador import identificador_processo
+
+_acordar = threading.Event()
+
+# ==========================
+# Enfileiramento
+# ==========================
+def enfileirar_email(destinatario, assunto, corpo):
+    """Coloca a mensagem na fila, sem commit; o envio começa depois do commit de quem chama."""
+    mensagem = EmailSaida(destinatario=destinatario, assunto=assunto, corpo=corpo)
+    db.session.add(mensagem)
+    db.session.info['acordar_envio'] = True
+    return mensagem
+
+@event.listens_for(Session, 'after_commit')
+def _acordar_apos_commit(session):
+    if session.info.pop('acordar_envio', False):
+        _acordar.set()
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_aviso(session):
+    session.info.pop('acordar_envio', None)
+
+# ==========================
+# Envio
+# ==========================
+def reservar_lote(dono, tamanho, prazo_segundos):
+    """Reserva até `tamanho` mensagens para `dono` e as retorna (com commit)."""
+    agora = datetime.utcnow()
+    elegivel = or_(
+        and_(EmailSaida.status == 'pendente', EmailSaida.proxima_tentativa_em <= agora),
+        and_(EmailSaida.status == 'enviando', EmailSaida.reservado_ate < agora),
+    )
+    ids = db.session.execute(
+        select(EmailSaida.id).where(elegivel).order_by(EmailSaida.id).limit(tamanho)
+    ).scalars().all()
+    if not ids:
+        return []
+    # a condição se repete no UPDATE: o que outro processo reservou antes fica de fora
+    db.session.execute(
+        update(EmailSaida).where(EmailSaida.id.in_(ids), elegivel)
+        .values(status='enviando', reservado_por=dono, reservado_ate=agora + timedelta(seconds=prazo_segundos))
+    )
+    db.session.commit()
+    return EmailSaida.query.filter(EmailSaida.id.in_(ids), EmailSaida.reservado_por == dono,
+                                   EmailSaida.status == 'enviando').order_by(EmailSaida.id).all()
+
+def conectar_smtp(config):
+    """Abre a conexão SMTP com as configurações MAIL_* (com timeout)."""
+    classe = smtplib.SMTP_SSL if config.get('MAIL_USE_SSL') else smtplib.SMTP
+    conexao = classe(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=config.get('MAIL_TIMEOUT_SEGUNDOS', 10))
+    try:
+        if config.get('MAIL_USE_TLS') and not config.get('MAIL_USE_SSL'):
+            conexao.starttls()
+        if config.get('MAIL_USERNAME') and config.get('MAIL_PASSWORD'):
+            conexao.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+    except BaseException:
+        conexao.close()
+        raise
+    return conexao
+
+def _montar(mensagem, remetente):
+    email = EmailMessage()
+    email['From'] = remetente
+    email['To'] = mensagem.destinatario
+    email['Subject'] = mensagem.assunto
+    email.set_content(mensagem.corpo)
+    return email
+
+def _reagendar(mensagem, erro, config, definitivo=False):
+    mensagem.tentativas += 1
+    mensagem.ultimo_erro = str(erro)[:500]
+    mensagem.reservado_por = None
+    mensagem.reservado_ate = None
+    if definitivo or mensagem.tentativas >= config.get('EMAIL_MAX_TENTATIVAS', 6):
+        mensagem.status = 'falhou'
+        return 'falhas'
+    espera = min(config.get('EMAIL_ESPERA_BASE_SEGUNDOS', 30) * 2 ** (mensagem.tentativas - 1),
+                 config.get('EMAIL_ESPERA_MAX_SEGUNDOS', 3600))
+    mensagem.status = 'pendente'
+    mensagem.proxima_tentativa_em = datetime.utcnow() + timedelta(seconds=espera)
+    return 'reagendados'
+
+def enviar_lote(mensagens, resultado):
+    """Envia as mensagens reservadas por uma só conexão SMTP e grava o resultado de cada uma.
+
+    Retorna False se a conexão com o servidor falhou (não adianta tentar outro lote agora).
+    """
+    config = current_app.config
+    conexao = None
+    try:
+        conexao = conectar_smtp(config)
+    except (smtplib.SMTPException, OSError) as e:
+        current_app.logger.warning("SMTP indisponível (%s): %d e-mail(s) reagendado(s)", e, len(mensagens))
+        for m in mensagens:
+            resultado[_reagendar(m, e, config)] += 1
+        db.session.commit()
+        return False
+
+    try:
+        for i, m in enumerate(mensagens):
+            try:
+                conexao.send_message(_montar(m, config['MAIL_DEFAULT_SENDER']))
+            except smtplib.SMTPRecipientsRefused as e:
+                resultado[_reagendar(m, e, config, definitivo=True)] += 1
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                # conexão perdida: esta e as seguintes voltam para a fila
+                for resto in mensagens[i:]:
+                    resultado[_reagendar(resto, e, config)] += 1
+                conexao = None
+                return False
+            except smtplib.SMTPException as e:
+                resultado[_reagendar(m, e, config)] += 1
+            else:
+                m.status = 'enviado'
+                m.enviado_em = datetime.utcnow()
+                m.tentativas += 1
+                m.reservado_por = None
+                m.reservado_ate = None
+                resultado['enviados'] += 1
+    finally:
+        db.session.commit()
+        if conexao is not None:
+            try:
+                conexao.quit()
+            except (smtplib.SMTPException, OSError):
+                conexao.close()
+    return True
+
+def enviar_pendentes(dono=None):
+    """Envia tudo o que está elegível, um lote por vez. Retorna {'enviados', 'reagendados', 'falhas'}."""
+    config = current_app.config
+    dono = dono or identificador_processo()
+    resultado = {'enviados': 0, 'reagendados': 0, 'falhas': 0}
+    while True:
+        lote = reservar_lote(dono, config.get('EMAIL_LOTE', 50), config.get('EMAIL_RESERVA_SEGUNDOS', 300))
+        if not lote:
+            return resultado
+        if not enviar_lote(lote, resultado):
+            return resultado  # servidor fora do ar: espera o próximo ciclo
+
+# ==========================
+# Thread de envio
+# ==========================
+def iniciar_envio(app):
+    """Sobe a thread que envia a fila ao ser acordada ou a cada EMAIL_INTERVALO_SEGUNDOS."""
+    if not app.config.get('EMAIL_ENVIO_HABILITADO', True):
+        app.logger.info("Envio de e-mails desabilitado (EMAIL_ENVIO_HABILITADO).")
+        return
+    dono = identificador_processo()
+    intervalo = app.config.get('EMAIL_INTERVALO_SEGUNDOS', 30)
+
+    def ciclo():
+        while True:
+            _acordar.wait(intervalo)
+            with app.app_context():
+                try:
+                    # limpa logo antes de ler a fila: um commit daqui em diante ou já
+                    # entra neste envio ou acorda a próxima volta, nunca se perde
+                    _acordar.clear()
+                    resultado = enviar_pendentes(dono)
+                    if any(resultado.values()):
+                        app.logger.info(f"Caixa de saída: {resultado}")
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception("Erro enviando a caixa de saída")
+                finally:
+                    db.session.remove()
+
+    threading.Thread(target=ciclo, name='caixa-saida', daemon=True).start()
+
+if __name__ == '__main__':
+    from flask import Flask
+    from config import Config
+    from banco import configurar_engine
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    with app.app_context():
+        configurar_engine(app)
+        db.create_all()
+        print(f"Caixa de saída: {enviar_pendentes()}")
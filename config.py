@@ -1,17 +1,113 @@
 # config.py
+import json
 import os
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+# Perfis de engine do banco: opções do SQLAlchemy e PRAGMAs aplicados a cada conexão (banco.py)
+DB_PROFILES = {
+    # SQLite em produção: WAL deixa leitores trabalharem durante a transação longa da
+    # importação; busy_timeout espera a trava em vez de falhar com "database is locked".
+    'sqlite': {
+        'engine_options': {
+            'connect_args': {'timeout': 30, 'check_same_thread': False},
+            'pool_size': 10,
+            'max_overflow': 20,
+        },
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 30000,
+            'cache_size': -64000,       # KiB (~64 MB)
+            'mmap_size': 268435456,     # 256 MB
+            'temp_store': 'MEMORY',
+        },
+    },
+    # SQLite sem ajustes (comportamento antigo, útil para comparar)
+    'sqlite_padrao': {
+        'engine_options': {},
+        'pragmas': {},
+    },
+    'postgres': {
+        'engine_options': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_pre_ping': True,
+            'pool_recycle': 1800,
+            'pool_timeout': 30,
+        },
+        'pragmas': {},
+    },
+}
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'troque_por_alguma_coisa_secreta'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Perfil de engine (DB_PROFILES); por padrão segue o tipo do banco
+    DB_PROFILE = os.environ.get('DB_PROFILE') or \
+        ('postgres' if SQLALCHEMY_DATABASE_URI.startswith('postgres') else 'sqlite')
+    SQLALCHEMY_ENGINE_OPTIONS = DB_PROFILES[DB_PROFILE]['engine_options']
+
+    # Importação de uploads PCP: linhas gravadas por lote
+    PCP_IMPORT_CHUNK_SIZE = int(os.environ.get('PCP_IMPORT_CHUNK_SIZE', 1000))
+    # Uploads gravados pelo conteúdo, com o cache das colunas lidas; passando do
+    # limite, os usados há mais tempo são removidos
+    UPLOAD_PASTA = os.environ.get('UPLOAD_PASTA', './uploads')
+    UPLOAD_CACHE_MAX_MB = int(os.environ.get('UPLOAD_CACHE_MAX_MB', 512))
+
+    # Agendador da importação: só um processo (o líder) roda; a liderança expira
+    # se o líder parar de renová-la
+    AGENDADOR_HABILITADO = os.environ.get('AGENDADOR_HABILITADO', '1').lower() not in ('0', 'false', 'nao', 'não')
+    AGENDADOR_LEASE_SEGUNDOS = int(os.environ.get('AGENDADOR_LEASE_SEGUNDOS', 60))
+    IMPORTACAO_INTERVALO_MINUTOS = int(os.environ.get('IMPORTACAO_INTERVALO_MINUTOS', 5))
+
+    # Planilhas da importação automática, em JSON:
+    # [{"caminho": "...", "aba": "Plan-VenttosLogistica", "linha_cabecalho": 1, "motor": "layout"}, ...]
+    # Vazio: só importer.PLANILHA_CAMINHO. A última da lista prevalece em conflitos.
+    PCP_PLANILHAS = json.loads(os.environ.get('PCP_PLANILHAS') or '[]')
+    # Motor de leitura das planilhas sem "motor" próprio (importer.MOTORES):
+    # 'padrao' (cabeçalho na linha 1) ou 'layout' (B6:H com ffill, como o xlwings)
+    PCP_MOTOR_IMPORTACAO = os.environ.get('PCP_MOTOR_IMPORTACAO', 'padrao')
+    # Processos que leem e normalizam as planilhas em paralelo (um por planilha)
+    IMPORTACAO_PROCESSOS = int(os.environ.get('IMPORTACAO_PROCESSOS', min(4, os.cpu_count() or 1)))
+
+    # Trava da importação automática: expira se o processo dono morrer
+    IMPORT_LOCK_TTL_MINUTES = int(os.environ.get('IMPORT_LOCK_TTL_MINUTES', 30))
+
+    # Confirmação de alteração de status: validade do token emitido após a senha
+    STATUS_CONFIRM_TTL_SECONDS = int(os.environ.get('STATUS_CONFIRM_TTL_SECONDS', 300))
+
+    # Cache do usuário logado (user_loader): validade de cada entrada
+    USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
+
+    # Painel por período: itens por página (paginação por cursor)
+    DASHBOARD_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE', 200))
+
+    # Métricas (/metrics): requisições acima deste tempo vão para o log com as
+    # consultas mais pesadas; com METRICAS_TOKEN, o scrape exige 'Authorization: Bearer'
+    METRICAS_REQUISICAO_LENTA_MS = int(os.environ.get('METRICAS_REQUISICAO_LENTA_MS', 1000))
+    METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+
+    # Eventos em tempo real (SSE): eventos guardados por cliente conectado
+    EVENTOS_FILA_MAX = int(os.environ.get('EVENTOS_FILA_MAX', 100))
+
     # SMTP para recuperação de senha
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.seuprovedor.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
-    MAIL_USE_TLS = True
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', '1').lower() not in ('0', 'false', 'nao', 'não')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'no-reply@venttos.com.br')
+    MAIL_TIMEOUT_SEGUNDOS = int(os.environ.get('MAIL_TIMEOUT_SEGUNDOS', 10))
+
+    # Caixa de saída (caixa_saida.py): e-mails enviados em segundo plano, em lotes
+    # por conexão SMTP, com nova tentativa e espera exponencial
+    EMAIL_ENVIO_HABILITADO = os.environ.get('EMAIL_ENVIO_HABILITADO', '1').lower() not in ('0', 'false', 'nao', 'não')
+    EMAIL_LOTE = int(os.environ.get('EMAIL_LOTE', 50))
+    EMAIL_INTERVALO_SEGUNDOS = int(os.environ.get('EMAIL_INTERVALO_SEGUNDOS', 30))
+    EMAIL_MAX_TENTATIVAS = int(os.environ.get('EMAIL_MAX_TENTATIVAS', 6))
+    EMAIL_ESPERA_BASE_SEGUNDOS = int(os.environ.get('EMAIL_ESPERA_BASE_SEGUNDOS', 30))
+    EMAIL_ESPERA_MAX_SEGUNDOS = int(os.environ.get('EMAIL_ESPERA_MAX_SEGUNDOS', 3600))
+    EMAIL_RESERVA_SEGUNDOS = int(os.environ.get('EMAIL_RESERVA_SEGUNDOS', 300))
@@ -0,0 +1,42 @@
+# confirmacao.py
+"""Token de confirmação (step-up) para alterações de status.
+
+Depois de uma verificação de senha, o usuário recebe um token assinado e de
+curta duração. Enquanto ele vale, as próximas alterações de status não
+precisam recalcular o hash da senha (PBKDF2). O token vale só para o escopo
+'status', para o mesmo usuário e para a mesma sessão: o nonce fica na sessão
+e é descartado no logout.
+"""
+import secrets
+from flask import current_app, session
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+SALT = 'confirmacao-status'
+ESCOPO_STATUS = 'status'
+CHAVE_NONCE = 'confirmacao_nonce'
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt=SALT)
+
+def emitir_token(user_id, escopo=ESCOPO_STATUS):
+    """Emite um token para `user_id`. Retorna (token, ttl_em_segundos)."""
+    nonce = session.get(CHAVE_NONCE)
+    if not nonce:
+        nonce = session[CHAVE_NONCE] = secrets.token_urlsafe(16)
+    token = _serializer().dumps({'uid': user_id, 'sid': nonce, 'escopo': escopo})
+    return token, current_app.config['STATUS_CONFIRM_TTL_SECONDS']
+
+def validar_token(token, user_id, escopo=ESCOPO_STATUS):
+    if not token or not session.get(CHAVE_NONCE):
+        return False
+    try:
+        dados = _serializer().loads(token, max_age=current_app.config['STATUS_CONFIRM_TTL_SECONDS'])
+    except (SignatureExpired, BadSignature):
+        return False
+    return (dados.get('uid') == user_id
+            and dados.get('escopo') == escopo
+            and secrets.compare_digest(str(dados.get('sid')), session[CHAVE_NONCE]))
+
+def revogar_tokens():
+    """Invalida todos os tokens emitidos nesta sessão."""
+    session.pop(CHAVE_NONCE, None)
@@ -0,0 +1,157 @@
+# dashboard_cache.py
+"""Cache em memória do painel agrupado por cliente, um por data.
+
+Cada data tem um contador de versão na tabela contador_versao. Quem grava em
+ItemStatus chama invalidar_datas() na mesma transação, e todos os processos
+passam a enxergar a versão nova. Uma consulta pela chave primária basta para
+saber se o payload em cache ainda vale, e a versão também serve de ETag.
+
+Períodos (vários dias, filtros por cliente e status) não passam pelo cache: são
+lidos em páginas por pagina_itens(), com cursor sobre o índice (data, modelo).
+"""
+import base64
+import threading
+from datetime import date
+from collections import OrderedDict
+from sqlalchemy import select, update, insert, and_, or_
+from models import db, ItemStatus, ContadorVersao
+from eventos import publicar_apos_commit
+
+MAX_DATAS = 64
+
+_cache = OrderedDict()  # data -> (versao, payload)
+_lock = threading.Lock()
+
+def _chave(data):
+    return f"dashboard:{data.isoformat()}"
+
+def versao_data(data):
+    versao = db.session.execute(
+        select(ContadorVersao.versao).where(ContadorVersao.chave == _chave(data))
+    ).scalar()
+    return versao or 0
+
+def invalidar_datas(datas):
+    """Incrementa a versão das datas informadas, sem commit (vai junto com a gravação).
+
+    Retorna {data: nova_versao} e agenda um evento 'item_status' por data, enviado
+    aos clientes conectados quando a transação for confirmada. Três comandos
+    para qualquer número de datas: UPDATE em lote, leitura das versões e INSERT
+    das chaves que ainda não existiam.
+    """
+    por_chave = {_chave(d): d for d in set(datas)}
+    if not por_chave:
+        return {}
+    db.session.execute(
+        update(ContadorVersao).where(ContadorVersao.chave.in_(por_chave))
+        .values(versao=ContadorVersao.versao + 1)
+    )
+    atuais = dict(db.session.execute(
+        select(ContadorVersao.chave, ContadorVersao.versao).where(ContadorVersao.chave.in_(por_chave))
+    ).all())
+    novas = [chave for chave in por_chave if chave not in atuais]
+    if novas:
+        db.session.execute(insert(ContadorVersao), [{'chave': chave, 'versao': 1} for chave in novas])
+        atuais.update(dict.fromkeys(novas, 1))
+
+    versoes = {}
+    for chave, data in por_chave.items():
+        versoes[data] = atuais[chave]
+        publicar_apos_commit({'tipo': 'item_status', 'data': data.isoformat(), 'versao': versoes[data]})
+    return versoes
+
+COLUNAS_ITEM = (ItemStatus.data, ItemStatus.cliente, ItemStatus.modelo, ItemStatus.quantidade,
+                ItemStatus.status, ItemStatus.usuario_ultimo_update, ItemStatus.hora_ultimo_update)
+
+def _formatar_linhas(linhas):
+    """Converte tuplas (COLUNAS_ITEM) no formato de ItemStatus.to_dict().
+
+    Datas e horas se repetem muito (a importação grava a mesma hora em todas as
+    linhas), então cada valor distinto é formatado uma vez só.
+    """
+    datas = {d: d.strftime('%Y-%m-%d') for d in {l[0] for l in linhas}}
+    horas = {h: h.strftime('%d/%m/%Y %H:%M') for h in {l[6] for l in linhas} if h}
+    horas[None] = ''
+    return [{
+        'cliente': cliente,
+        'modelo': modelo,
+        'quantidade': quantidade,
+        'status': status,
+        'usuario': usuario,
+        'hora': horas[hora],
+        'data': datas[data],
+    } for data, cliente, modelo, quantidade, status, usuario, hora in linhas]
+
+def itens_da_data(data, desde_versao=None):
+    """Linhas de ItemStatus da data no formato de ItemStatus.to_dict(), só com as colunas usadas.
+
+    Com `desde_versao`, traz apenas as gravadas depois dessa versão.
+    """
+    consulta = select(*COLUNAS_ITEM).where(ItemStatus.data == data)
+    if desde_versao is not None:
+        consulta = consulta.where(ItemStatus.versao > desde_versao)
+    return _formatar_linhas(db.session.execute(consulta).all())
+
+# ==========================
+# Períodos com paginação por cursor
+# ==========================
+def codificar_cursor(data, modelo):
+    return base64.urlsafe_b64encode(f"{data}|{modelo}".encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(cursor):
+    """Retorna (data, modelo) do cursor. ValueError se o cursor for inválido."""
+    try:
+        data, modelo = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+        return date.fromisoformat(data), modelo
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+def pagina_itens(inicio, fim, cliente=None, status=None, cursor=None, limite=200):
+    """Uma página de itens entre `inicio` e `fim`, em ordem de (data, modelo).
+
+    Continua depois do `cursor` (sem OFFSET: a consulta segue o índice a partir da
+    última chave vista). Retorna (itens, proximo_cursor); proximo_cursor é None na
+    última página.
+    """
+    consulta = select(*COLUNAS_ITEM).where(ItemStatus.data.between(inicio, fim))
+    if cliente:
+        consulta = consulta.where(ItemStatus.cliente == cliente)
+    if status:
+        consulta = consulta.where(ItemStatus.status == status)
+    if cursor:
+        data, modelo = decodificar_cursor(cursor)
+        consulta = consulta.where(or_(
+            ItemStatus.data > data,
+            and_(ItemStatus.data == data, ItemStatus.modelo > modelo),
+        ))
+    linhas = db.session.execute(
+        consulta.order_by(ItemStatus.data, ItemStatus.modelo).limit(limite + 1)
+    ).all()
+
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = codificar_cursor(linhas[-1][0], linhas[-1][2])
+    return _formatar_linhas(linhas), proximo
+
+def _montar_payload(data):
+    grouped = {}
+    for item in itens_da_data(data):
+        grouped.setdefault(item['cliente'], []).append(item)
+    return grouped
+
+def payload_dashboard(data):
+    """Retorna (versao, grouped) da data, remontando só quando a versão mudou."""
+    versao = versao_data(data)
+    with _lock:
+        atual = _cache.get(data)
+        if atual and atual[0] == versao:
+            _cache.move_to_end(data)
+            return atual
+    payload = (versao, _montar_payload(data))
+    with _lock:
+        _cache[data] = payload
+        _cache.move_to_end(data)
+        while len(_cache) > MAX_DATAS:
+            _cache.popitem(last=False)
+    return payload
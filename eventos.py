@@ -0,0 +1,87 @@
+# eventos.py
+"""Distribuição de eventos de status para os painéis conectados (Server-Sent Events).
+
+Cada cliente conectado tem uma fila limitada. Se um cliente lento deixa a fila
+encher, ela é descartada e substituída por um único evento 'resync', que faz o
+painel buscar o estado atual em /api/items. Assim a memória do servidor não
+cresce por causa de um cliente lento.
+
+Os eventos são agendados durante a transação (publicar_apos_commit) e só saem
+depois do commit. Um rollback os descarta. A distribuição é local ao processo:
+com vários workers, cada painel recebe os eventos do worker que atende sua
+conexão e usa /api/items?since=<versao> para alcançar o resto.
+"""
+import json
+import queue
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db
+
+FILA_MAX = 100
+HEARTBEAT_SEGUNDOS = 15
+
+_assinantes = set()
+_lock = threading.Lock()
+
+def assinar(tamanho=FILA_MAX):
+    fila = queue.Queue(maxsize=tamanho)
+    with _lock:
+        _assinantes.add(fila)
+    return fila
+
+def cancelar(fila):
+    with _lock:
+        _assinantes.discard(fila)
+
+def publicar(evento):
+    with _lock:
+        for fila in _assinantes:
+            try:
+                fila.put_nowait(evento)
+            except queue.Full:
+                # cliente atrasado: troca o acumulado por um pedido de ressincronização
+                try:
+                    while True:
+                        fila.get_nowait()
+                except queue.Empty:
+                    pass
+                fila.put_nowait({'tipo': 'resync'})
+
+def publicar_apos_commit(evento, session=None):
+    """Agenda o evento para ser publicado quando a transação atual for confirmada."""
+    session = session or db.session()
+    session.info.setdefault('eventos_pendentes', []).append(evento)
+
+def publicar_transicoes(transicoes):
+    """Assinante de transicoes.ao_transicionar: avisa os clientes sobre Items alterados.
+
+    Mudanças no painel (ItemStatus) já geram o evento 'item_status' por data ao
+    incrementar a versão (dashboard_cache.invalidar_datas).
+    """
+    for t in transicoes:
+        if t.tipo == 'item':
+            publicar_apos_commit({'tipo': 'item', 'id': t.id, 'status': t.para})
+
+@event.listens_for(Session, 'after_commit')
+def _publicar_pendentes(session):
+    for evento in session.info.pop('eventos_pendentes', []):
+        publicar(evento)
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_pendentes(session):
+    session.info.pop('eventos_pendentes', None)
+
+def stream(fila, heartbeat=HEARTBEAT_SEGUNDOS):
+    """Gerador no formato text/event-stream para uma fila assinada."""
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                evento = fila.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            yield f"event: {evento.get('tipo', 'message')}\ndata: {json.dumps(evento)}\n\n"
+    finally:
+        cancelar(fila)
@@ -0,0 +1,261 @@
+# exportacao.py
+"""Exportação de ItemStatus e ItemHistory em CSV ou XLSX, com os filtros do painel.
+
+O histórico traz os itens do painel (ItemStatus) e depois os Items de
+logística e faturamento, filtrados pela data do registro.
+
+As linhas vêm do banco em lotes (yield_per, cursor no servidor quando o banco
+suporta) e passam por um gerador até a resposta, então a memória não cresce com
+o tamanho do período. O CSV começa a sair logo com o cabeçalho. O XLSX é escrito
+direto num zip sem posicionamento (descritores de dados no lugar de voltar ao
+cabeçalho de cada arquivo): as partes fixas saem primeiro e a planilha vai
+sendo compactada e enviada enquanto as linhas chegam do banco.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, time, timedelta
+from xml.sax.saxutils import escape
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_login import login_required
+from sqlalchemy import select
+from models import db, ItemStatus, Item, Cliente, ItemHistory, User
+from api import ler_filtros_periodo
+
+exportacao_bp = Blueprint('exportacao', __name__, url_prefix='/exportar')
+
+LOTE_BANCO = 1000
+LINHAS_POR_ENVIO = 500
+BYTES_POR_ENVIO = 64 * 1024
+
+TIPOS_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# ==========================
+# Consultas
+# ==========================
+def _filtrar(consulta, filtros):
+    consulta = consulta.where(ItemStatus.data.between(filtros['inicio'], filtros['fim']))
+    if filtros['cliente']:
+        consulta = consulta.where(ItemStatus.cliente == filtros['cliente'])
+    if filtros['status']:
+        consulta = consulta.where(ItemStatus.status == filtros['status'])
+    return consulta
+
+def _formatar(valor):
+    if isinstance(valor, datetime):
+        return valor.strftime('%d/%m/%Y %H:%M')
+    if hasattr(valor, 'strftime'):
+        return valor.strftime('%d/%m/%Y')
+    return valor
+
+def linhas_item_status(filtros):
+    consulta = _filtrar(
+        select(ItemStatus.data, ItemStatus.cliente, ItemStatus.modelo, ItemStatus.quantidade,
+               ItemStatus.status, ItemStatus.usuario_ultimo_update, ItemStatus.hora_ultimo_update),
+        filtros,
+    ).order_by(ItemStatus.data, ItemStatus.modelo)
+    yield from db.session.execute(consulta.execution_options(yield_per=LOTE_BANCO))
+
+def linhas_item_history(filtros):
+    """Histórico que passa nos filtros (status = status atual do item).
+
+    Primeiro o dos itens do painel, pela data do painel; depois o dos Items
+    (faturamento, logística, uploads), pela data do registro (UTC), com a data
+    do registro na coluna Data.
+    """
+    consulta = _filtrar(
+        select(ItemStatus.data, ItemStatus.cliente, ItemStatus.modelo, ItemHistory.from_status,
+               ItemHistory.to_status, User.username, ItemHistory.comment, ItemHistory.criado_em)
+        .join(ItemStatus, ItemStatus.id == ItemHistory.item_status_id)
+        .outerjoin(User, User.id == ItemHistory.by_user_id),
+        filtros,
+    ).order_by(ItemStatus.data, ItemStatus.modelo, ItemHistory.criado_em)
+    yield from db.session.execute(consulta.execution_options(yield_per=LOTE_BANCO))
+
+    consulta = select(Cliente.nome, Item.modelo, ItemHistory.from_status, ItemHistory.to_status,
+                      User.username, ItemHistory.comment, ItemHistory.criado_em) \
+        .join(Item, Item.id == ItemHistory.item_id) \
+        .outerjoin(Cliente, Cliente.id == Item.cliente_id) \
+        .outerjoin(User, User.id == ItemHistory.by_user_id) \
+        .where(ItemHistory.item_status_id.is_(None)) \
+        .where(ItemHistory.criado_em >= datetime.combine(filtros['inicio'], time.min)) \
+        .where(ItemHistory.criado_em < datetime.combine(filtros['fim'] + timedelta(days=1), time.min))
+    if filtros['cliente']:
+        consulta = consulta.where(Cliente.nome == filtros['cliente'])
+    if filtros['status']:
+        consulta = consulta.where(Item.status == filtros['status'])
+    consulta = consulta.order_by(ItemHistory.criado_em, ItemHistory.id)
+    for linha in db.session.execute(consulta.execution_options(yield_per=LOTE_BANCO)):
+        yield (linha.criado_em.date(), *linha)
+
+# tabela -> (cabeçalho, gerador de linhas)
+EXPORTACOES = {
+    'item_status': (['Data', 'Cliente', 'Modelo', 'Quantidade', 'Status', 'Usuário', 'Última atualização'],
+                    linhas_item_status),
+    'item_history': (['Data', 'Cliente', 'Modelo', 'De', 'Para', 'Usuário', 'Comentário', 'Registrado em (UTC)'],
+                     linhas_item_history),
+}
+
+# ==========================
+# Formatos
+# ==========================
+def gerar_csv(cabecalho, linhas):
+    """CSV separado por ';' (Excel em português), com BOM UTF-8, enviado em partes."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff')
+    writer.writerow(cabecalho)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for n, linha in enumerate(linhas, 1):
+        writer.writerow([_formatar(v) for v in linha])
+        if n % LINHAS_POR_ENVIO == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+# Partes fixas do XLSX; estilos: 0 geral, 1 data (numFmt 14), 2 data e hora (numFmt 22)
+_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+PARTES_XLSX = {
+    '[Content_Types].xml': _XML + (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'),
+    '_rels/.rels': _XML + (
+        f'<Relationships xmlns="{_PKG_REL}">'
+        f'<Relationship Id="rId1" Type="{_REL}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    'xl/_rels/workbook.xml.rels': _XML + (
+        f'<Relationships xmlns="{_PKG_REL}">'
+        f'<Relationship Id="rId1" Type="{_REL}/worksheet" Target="worksheets/sheet1.xml"/>'
+        f'<Relationship Id="rId2" Type="{_REL}/styles" Target="styles.xml"/>'
+        '</Relationships>'),
+    'xl/styles.xml': _XML + (
+        f'<styleSheet xmlns="{_NS}">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'),
+}
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+_CARACTERES_INVALIDOS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')  # não cabem em XML
+
+class _SaidaZip:
+    """Destino do zip sem tell/seek: guarda os bytes escritos até serem retirados para envio."""
+
+    def __init__(self):
+        self.partes = []
+        self.tamanho = 0
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        self.tamanho += len(dados)
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        dados = b''.join(self.partes)
+        self.partes.clear()
+        self.tamanho = 0
+        return dados
+
+def _coluna(i):
+    letras = ''
+    while i:
+        i, resto = divmod(i - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+def _celula(ref, valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return f'<c r="{ref}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c r="{ref}"><v>{valor}</v></c>'
+    if isinstance(valor, datetime):  # datas ficam como datas do Excel
+        return f'<c r="{ref}" s="2"><v>{(valor - _EPOCA_EXCEL).total_seconds() / 86400}</v></c>'
+    if isinstance(valor, date):
+        return f'<c r="{ref}" s="1"><v>{(valor - _EPOCA_EXCEL.date()).days}</v></c>'
+    texto = escape(_CARACTERES_INVALIDOS.sub('', str(valor)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+def _linha_xml(n, valores):
+    celulas = ''.join(_celula(f'{_coluna(i)}{n}', v) for i, v in enumerate(valores, 1))
+    return f'<row r="{n}">{celulas}</row>'.encode('utf-8')
+
+def gerar_xlsx(cabecalho, linhas, titulo):
+    """XLSX de uma aba, compactado e enviado em partes enquanto as linhas chegam."""
+    saida = _SaidaZip()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for nome, conteudo in PARTES_XLSX.items():
+            zf.writestr(nome, conteudo)
+        zf.writestr('xl/workbook.xml', _XML + (
+            f'<workbook xmlns="{_NS}" xmlns:r="{_REL}"><sheets>'
+            f'<sheet name="{escape(titulo, {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/>'
+            '</sheets></workbook>'))
+        yield saida.retirar()  # os primeiros bytes saem antes da consulta
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write(f'{_XML}<worksheet xmlns="{_NS}"><sheetData>'.encode('utf-8'))
+            planilha.write(_linha_xml(1, cabecalho))
+            for n, linha in enumerate(linhas, 2):
+                planilha.write(_linha_xml(n, linha))
+                if saida.tamanho >= BYTES_POR_ENVIO:
+                    yield saida.retirar()
+            planilha.write(b'</sheetData></worksheet>')
+    yield saida.retirar()
+
+# ==========================
+# Rotas
+# ==========================
+@exportacao_bp.route('/<tabela>.<formato>')
+@login_required
+def exportar(tabela, formato):
+    """Exporta item_status ou item_history em csv ou xlsx.
+
+    Filtros como no painel: ?data_inicio&data_fim&cliente&status.
+    """
+    if tabela not in EXPORTACOES or formato not in ('csv', 'xlsx'):
+        return jsonify({'ok': False, 'msg': 'Exportação não encontrada'}), 404
+    try:
+        filtros = ler_filtros_periodo(request.args)
+    except ValueError as e:
+        return jsonify({'ok': False, 'msg': str(e)}), 400
+
+    cabecalho, gerador = EXPORTACOES[tabela]
+    linhas = gerador(filtros)
+    if formato == 'csv':
+        corpo, mimetype = gerar_csv(cabecalho, linhas), 'text/csv; charset=utf-8'
+    else:
+        corpo, mimetype = gerar_xlsx(cabecalho, linhas, tabela), TIPOS_XLSX
+
+    nome = f"{tabela}_{filtros['inicio'].isoformat()}_{filtros['fim'].isoformat()}.{formato}"
+    resp = Response(stream_with_context(corpo), mimetype=mimetype)
+    resp.headers['Content-Disposition'] = f'attachment; filename="{nome}"'
+    resp.headers['Cache-Control'] = 'no-store'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
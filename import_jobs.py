@@ -0,0 +1,178 @@
+# import_jobs.py
+"""Jobs de importação da planilha PCP em segundo plano.
+
+Botão "Importar agora", agendador e importação inicial passam por aqui. Uma
+trava no banco (tabela import_lock) garante um único job ativo entre todos os
+processos; quem pede uma importação enquanto outra roda recebe o id do job em
+andamento em vez de iniciar outro.
+
+Com SQLite a transação da importação bloqueia outras escritas, então o
+progresso fino (fase, linhas) fica em memória no processo que executa o job;
+o registro em import_job é atualizado no início e no fim.
+
+A trava vale IMPORT_LOCK_TTL_MINUTES e é renovada no início do job, a cada
+mudança de fase da gravação e, numa gravação longa, a cada terço do prazo.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+from models import db, ImportJob, ImportLock
+from importer import importar_planilhas
+
+LOCK_NOME = 'importacao_pcp'
+FASES_COM_RENOVACAO = ('gravacao', 'commit')  # a transação da importação já está gravando
+
+_progresso = {}  # job_id -> {'fase': ..., 'linhas_processadas': ...}
+_progresso_lock = threading.Lock()
+
+def _garantir_linha_lock():
+    if db.session.get(ImportLock, LOCK_NOME) is None:
+        try:
+            db.session.add(ImportLock(nome=LOCK_NOME))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+def _ttl():
+    return timedelta(minutes=current_app.config.get('IMPORT_LOCK_TTL_MINUTES', 30))
+
+def adquirir_lock(job_id):
+    """Tenta tomar a trava para `job_id`. Retorna o id do job dono da trava."""
+    _garantir_linha_lock()
+    ttl = _ttl()
+    dono = None
+    while dono is None:
+        agora = datetime.utcnow()
+        result = db.session.execute(
+            update(ImportLock)
+            .where(ImportLock.nome == LOCK_NOME)
+            .where(or_(ImportLock.job_id.is_(None), ImportLock.expira_em < agora))
+            .values(job_id=job_id, expira_em=agora + ttl)
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return job_id
+        # a trava pode ter sido liberada entre o UPDATE e a leitura: tenta de novo
+        dono = db.session.get(ImportLock, LOCK_NOME, populate_existing=True).job_id
+    return dono
+
+def renovar_lock(job_id):
+    """Prorroga a trava de `job_id` por mais um TTL. False se ela não é mais dele.
+
+    No SQLite (uma escrita por vez) a renovação vai na transação da importação,
+    sem commit: ninguém toma a trava enquanto ela grava. Nos demais bancos usa
+    uma transação própria, vista na hora pelos outros processos.
+    """
+    renovar = update(ImportLock) \
+        .where(ImportLock.nome == LOCK_NOME, ImportLock.job_id == job_id) \
+        .values(expira_em=datetime.utcnow() + _ttl())
+    if db.engine.dialect.name == 'sqlite':
+        return db.session.execute(renovar).rowcount == 1
+    with db.engine.begin() as conn:
+        return conn.execute(renovar).rowcount == 1
+
+def liberar_lock(job_id):
+    db.session.execute(
+        update(ImportLock)
+        .where(ImportLock.nome == LOCK_NOME, ImportLock.job_id == job_id)
+        .values(job_id=None, expira_em=None)
+    )
+    db.session.commit()
+
+def _executar(job_id, **kwargs):
+    job = db.session.get(ImportJob, job_id)
+    job.status = 'executando'
+    job.iniciado_em = datetime.utcnow()
+    renovar_lock(job_id)  # o tempo na fila não conta
+    db.session.commit()
+
+    intervalo = _ttl().total_seconds() / 3
+    ultima = {'fase': None, 'renovada_em': time.monotonic()}
+
+    def progresso(fase, linhas):
+        with _progresso_lock:
+            _progresso[job_id] = {'fase': fase, 'linhas_processadas': linhas}
+        agora = time.monotonic()
+        if fase in FASES_COM_RENOVACAO and (fase != ultima['fase'] or agora - ultima['renovada_em'] > intervalo):
+            if not renovar_lock(job_id):
+                current_app.logger.warning("Job de importação %s perdeu a trava %s", job_id, LOCK_NOME)
+            ultima['renovada_em'] = agora
+        ultima['fase'] = fase
+
+    try:
+        resumo = importar_planilhas(progresso=progresso, **kwargs)
+        status = 'concluido'
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Erro no job de importação %s", job_id)
+        resumo = {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': [f"Erro geral: {e}"]}
+        status = 'erro'
+
+    try:
+        with _progresso_lock:
+            final = _progresso.pop(job_id, {})
+        job = db.session.get(ImportJob, job_id)
+        job.status = status
+        job.fase = 'concluido'
+        job.linhas_processadas = final.get('linhas_processadas', 0)
+        job.resumo = json.dumps(resumo, default=str)
+        job.finalizado_em = datetime.utcnow()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()  # senão liberar_lock falha na sessão pendente e a trava fica presa
+        raise
+    finally:
+        liberar_lock(job_id)
+    return resumo
+
+def _executar_em_contexto(app, job_id, kwargs):
+    with app.app_context():
+        _executar(job_id, **kwargs)
+
+def submeter_importacao(origem='usuario', solicitado_por=None, em_background=True, **kwargs):
+    """Cria um job de importação ou se junta ao que já está rodando.
+
+    Retorna (job_id, novo). Com em_background=False o job roda na thread atual
+    (agendador e importação inicial). kwargs vão para importar_planilhas.
+    """
+    job = ImportJob(status='pendente', fase='fila', origem=origem, solicitado_por=solicitado_por)
+    db.session.add(job)
+    db.session.commit()
+
+    dono = adquirir_lock(job.id)
+    if dono != job.id:
+        db.session.delete(job)
+        db.session.commit()
+        return dono, False
+
+    if em_background:
+        app = current_app._get_current_object()
+        threading.Thread(target=_executar_em_contexto, args=(app, job.id, kwargs),
+                         name=f'import-job-{job.id}', daemon=True).start()
+    else:
+        _executar(job.id, **kwargs)
+    return job.id, True
+
+def status_job(job_id):
+    """Estado do job como dict, com o progresso ao vivo quando ele roda neste processo."""
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return None
+    dados = {
+        'id': job.id,
+        'status': job.status,
+        'fase': job.fase,
+        'linhas_processadas': job.linhas_processadas or 0,
+        'origem': job.origem,
+        'criado_em': job.criado_em.isoformat() if job.criado_em else None,
+        'iniciado_em': job.iniciado_em.isoformat() if job.iniciado_em else None,
+        'finalizado_em': job.finalizado_em.isoformat() if job.finalizado_em else None,
+        'resumo': json.loads(job.resumo) if job.resumo else None,
+    }
+    with _progresso_lock:
+        dados.update(_progresso.get(job_id, {}))
+    return dados
@@ -1,49 +1,159 @@
 # importer.py
-import pandas as pd
-from datetime import datetime, date
+from datetime import datetime
+import hashlib
 import os
+from contextlib import ExitStack
 from flask import current_app
-from models import db, Cliente, ItemStatus
+from sqlalchemy import insert, update, select
+from models import db, ItemStatus, ArquivoImportado
+from leitor_planilha import LeitorPlanilha, LeitorLayoutPCP, TAMANHO_BLOCO
+from dashboard_cache import invalidar_datas
+from cache_clientes import resolver_clientes
+from agregados import somar_resumo, delta_resumo
+from metricas import fase, cronometrar, novas_fases, registrar_fases_importacao
 
 PLANILHA_CAMINHO = r"Q:\EDUARDO LIBORIO\Programação (f)\Venttos Logistica - Arquivos\pcp-venttos-manaus.xlsm"
 PLANILHA_ABA = "Plan-VenttosLogistica"
+USUARIO_IMPORTACAO = 'importacao_automatica'
 
-def safe_parse_int_quantity(val):
-    if pd.isna(val):
-        return 0
-    try:
-        return int(val)
-    except:
-        try:
-            return int(float(str(val).replace(',', '.')))
-        except:
-            return 0
-
-def parse_bool_pronto(val):
-    if pd.isna(val):
-        return False
-    return str(val).strip().lower() in ['sim', 's', 'yes', 'true', '1', 'ok', 'pronto']
-
-def importar_planilha(path=PLANILHA_CAMINHO, sheet_name=PLANILHA_ABA):
-    resumo = {'created': 0, 'updated': 0, 'errors': []}
-    if not os.path.exists(path):
-        resumo['errors'].append(f"Arquivo não encontrado: {path}")
-        current_app.logger.warning(resumo['errors'][-1])
-        return resumo
+# ==========================
+# Detecção de alterações
+# ==========================
+def fingerprint_registro(r):
+    """Hash do conteúdo de uma linha da planilha (o que a importação grava no ItemStatus)."""
+    conteudo = f"{r['cliente']}\x1f{r['quantidade']}\x1f{r['status']}"
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
 
-    try:
-        df = pd.read_excel(path, sheet_name=sheet_name, engine='openpyxl')
-    except Exception as e:
-        resumo['errors'].append(f"Erro ao ler Excel: {e}")
-        current_app.logger.exception("Erro lendo Excel")
-        return resumo
+def sha256_arquivo(path, bloco=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for parte in iter(lambda: f.read(bloco), b''):
+            h.update(parte)
+    return h.hexdigest()
 
-    if df.empty:
-        resumo['errors'].append("Planilha vazia.")
+def arquivo_inalterado(path):
+    """Compara tamanho, mtime e hash do arquivo com a última importação registrada.
+
+    Retorna (inalterado, assinatura). Se tamanho e mtime batem, o arquivo é
+    considerado igual sem reler o conteúdo; caso contrário o hash decide. Se só
+    o mtime mudou (arquivo salvo de novo sem alterações), grava o mtime novo com
+    commit, para as próximas verificações não precisarem do hash.
+    """
+    st = os.stat(path)
+    registro = ArquivoImportado.query.filter_by(caminho=os.path.abspath(path)).first()
+    assinatura = {'tamanho': st.st_size, 'mtime': st.st_mtime, 'sha256': None}
+    if registro and registro.tamanho == st.st_size and registro.mtime == st.st_mtime:
+        assinatura['sha256'] = registro.sha256
+        return True, assinatura
+    assinatura['sha256'] = sha256_arquivo(path)
+    inalterado = bool(registro) and registro.tamanho == st.st_size and registro.sha256 == assinatura['sha256']
+    if inalterado:
+        registro.mtime = st.st_mtime
+        db.session.commit()
+    return inalterado, assinatura
+
+def registrar_arquivo(path, assinatura):
+    caminho = os.path.abspath(path)
+    registro = ArquivoImportado.query.filter_by(caminho=caminho).first()
+    if not registro:
+        registro = ArquivoImportado(caminho=caminho)
+        db.session.add(registro)
+    registro.tamanho = assinatura['tamanho']
+    registro.mtime = assinatura['mtime']
+    registro.sha256 = assinatura['sha256']
+    registro.importado_em = datetime.utcnow()
+
+# ==========================
+# Upsert em lote
+# ==========================
+def carregar_clientes(nomes):
+    """Retorna {nome: id} dos clientes informados, criando os que faltam (via cache_clientes)."""
+    return {nome: ref.id for nome, ref in resolver_clientes(nomes).items()}
+
+def upsert_item_status(registros, resumo):
+    """Grava os registros (dicts com cliente, modelo, quantidade, status, data) em ItemStatus.
+
+    Carrega as chaves (modelo, data) existentes das datas do bloco em uma única
+    consulta, separa novos e existentes em memória e grava com um INSERT e um UPDATE
+    em lote. Linhas cujo fingerprint não mudou desde a última importação não são
+    tocadas, preservando alterações manuais de status. Linhas novas guardam em
+    recebido_em o momento do recebimento (início do lead time). O cliente é gravado com o
+    nome cadastrado para a sua chave (cache_clientes). A diferença gravada também
+    é somada em resumo_diario. O commit fica a cargo de quem chama.
+    """
+    if not registros:
         return resumo
 
-    # mapeamento de colunas
-    col_map = {c.strip().lower(): c for c in df.columns}
+    # grafias diferentes do mesmo cliente ("ACME", "Acme ") gravam o nome já cadastrado
+    clientes = resolver_clientes(r['cliente'] for r in registros)
+    for r in registros:
+        r['cliente'] = clientes[r['cliente']].nome
+
+    datas = {r['data'] for r in registros}
+    existentes, anteriores = {}, {}
+    for id_, modelo, data, fp, cliente, quantidade, status in db.session.execute(
+        select(ItemStatus.id, ItemStatus.modelo, ItemStatus.data, ItemStatus.fingerprint,
+               ItemStatus.cliente, ItemStatus.quantidade, ItemStatus.status)
+        .where(ItemStatus.data.in_(datas))
+    ):
+        existentes[(modelo, data)] = (id_, fp)
+        anteriores[(modelo, data)] = (cliente, quantidade, status)
+
+    now = datetime.now()
+    recebido_em = datetime.utcnow()  # mesmo relógio do ItemHistory.criado_em
+    inserir, atualizar = {}, {}
+    for r in registros:
+        chave = (r['modelo'], r['data'])
+        fp = fingerprint_registro(r)
+        valores = {
+            'cliente': r['cliente'],
+            'quantidade': r['quantidade'],
+            'status': r['status'],
+            'usuario_ultimo_update': USUARIO_IMPORTACAO,
+            'hora_ultimo_update': now,
+            'fingerprint': fp,
+        }
+        if chave in existentes:
+            id_, fp_atual = existentes[chave]
+            if fp_atual == fp:
+                resumo['unchanged'] += 1
+                continue
+            atualizar[chave] = dict(valores, id=id_)
+            existentes[chave] = (id_, fp)
+            resumo['updated'] += 1
+        elif chave in inserir:
+            # linha repetida na planilha: a última ocorrência prevalece
+            inserir[chave].update(valores)
+            resumo['updated'] += 1
+        else:
+            inserir[chave] = dict(valores, modelo=r['modelo'], data=r['data'], recebido_em=recebido_em)
+            resumo['created'] += 1
+
+    versoes = invalidar_datas(data for _, data in list(inserir) + list(atualizar))
+    for (_, data), valores in list(inserir.items()) + list(atualizar.items()):
+        valores['versao'] = versoes[data]
+    if inserir:
+        db.session.execute(insert(ItemStatus), list(inserir.values()))
+    if atualizar:
+        db.session.execute(update(ItemStatus), list(atualizar.values()))
+
+    deltas = delta_resumo()
+    for (_, data), v in list(inserir.items()) + list(atualizar.items()):
+        deltas[(data, v['cliente'], v['status'])]['itens'] += 1
+        deltas[(data, v['cliente'], v['status'])]['quantidade'] += v['quantidade']
+    for chave in atualizar:
+        cliente, quantidade, status = anteriores[chave]
+        deltas[(chave[1], cliente, status)]['itens'] -= 1
+        deltas[(chave[1], cliente, status)]['quantidade'] -= quantidade
+    somar_resumo(deltas)
+    return resumo
+
+# ==========================
+# Importação da planilha
+# ==========================
+def mapear_colunas(colunas):
+    """Localiza as colunas pelo nome. Retorna {campo: posição} ou None se faltar obrigatória."""
+    col_map = {c.strip().lower(): i for i, c in enumerate(colunas)}
     def find_col(candidates):
         for c in candidates:
             k = c.strip().lower()
@@ -51,66 +161,304 @@ def importar_planilha(path=PLANILHA_CAMINHO, sheet_name=PLANILHA_ABA):
                 return col_map[k]
         return None
 
-    col_data = find_col(['Data', 'data'])
-    col_cliente = find_col(['Cliente', 'cliente', 'o cliente', 'cliente nome'])
-    col_modelo = find_col(['Modelo', 'modelo'])
-    col_quant = find_col(['Quantidade', 'quantidade', 'qtd', 'qtd.'])
-    col_pronto = find_col(['Pronto', 'pronto', 'ok'])
+    cols = {
+        'data': find_col(['Data', 'data']),
+        'cliente': find_col(['Cliente', 'cliente', 'o cliente', 'cliente nome']),
+        'modelo': find_col(['Modelo', 'modelo']),
+        'quantidade': find_col(['Quantidade', 'quantidade', 'qtd', 'qtd.']),
+        'pronto': find_col(['Pronto', 'pronto', 'ok']),
+    }
+    if any(cols[c] is None for c in ('data', 'cliente', 'modelo', 'quantidade')):
+        return None
+    return cols
+
+def mapear_colunas_layout(colunas):
+    """Como o importer_xlwings: a primeira coluna cujo nome contém o termo (Data, Cliente, ...)."""
+    nomes = [c.lower() for c in colunas]
+    def achar(*termos):
+        return next((i for i, nome in enumerate(nomes) if any(t in nome for t in termos)), None)
+
+    cols = {
+        'data': achar('data'),
+        'cliente': achar('cliente'),
+        'modelo': achar('modelo'),
+        'quantidade': achar('quant'),
+        'pronto': achar('pronto', 'ok'),
+    }
+    if any(cols[c] is None for c in ('data', 'cliente', 'modelo', 'quantidade')):
+        return None
+    return cols
 
-    if not (col_data and col_cliente and col_modelo and col_quant):
-        resumo['errors'].append("Colunas obrigatórias não encontradas (Data, Cliente, Modelo, Quantidade).")
-        current_app.logger.error(resumo['errors'][-1])
+# Motores de leitura: 'padrao' lê a aba a partir da linha de cabeçalho; 'layout'
+# segue o layout da planilha PCP (B6:H, ffill), o mesmo do importer_xlwings
+MOTORES = {
+    'padrao': (LeitorPlanilha, mapear_colunas),
+    'layout': (LeitorLayoutPCP, mapear_colunas_layout),
+}
+
+def abrir_leitor(pilha, path, sheet_name, linha_cabecalho, motor):
+    """Entra no leitor do motor dentro da `pilha` (ExitStack). Retorna (leitor, cols ou None)."""
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de importação desconhecido: {motor}")
+    classe, mapear = MOTORES[motor]
+    leitor = pilha.enter_context(classe(path, sheet_name, linha_cabecalho))
+    return leitor, mapear(leitor.colunas)
+
+def normalizar_bloco(numeros, linhas, cols, erros):
+    """Normaliza um bloco do LeitorPlanilha; devolve só as linhas válidas e anota as outras em `erros`."""
+    # pandas só é carregado quando uma importação roda de fato
+    import pandas as pd
+    from normalizacao import normalizar_frame
+    df = pd.DataFrame(linhas, index=numeros)
+    normalizado, invalidas = normalizar_frame(df, cols)
+    for numero, erro in invalidas.dropna().items():
+        erros.append(f"Linha {numero}: {erro}. Pulando.")
+    return normalizado[invalidas.isna()]
+
+def registros_do_bloco(numeros, linhas, cols, resumo):
+    """Converte um bloco de linhas do LeitorPlanilha em registros para o upsert."""
+    return normalizar_bloco(numeros, linhas, cols, resumo['errors']).to_dict('records')
+
+def importar_planilha(path=PLANILHA_CAMINHO, sheet_name=PLANILHA_ABA, forcar=False, progresso=None,
+                      linha_cabecalho=None, motor='padrao'):
+    """Importa a planilha PCP para ItemStatus e retorna o resumo.
+
+    `progresso`, se informado, é chamado como progresso(fase, linhas_processadas).
+    `motor` escolhe o leitor (MOTORES) e `linha_cabecalho` a linha do Excel com os
+    nomes das colunas (padrão do motor: 1 em 'padrao', 6 em 'layout'). O tempo de cada
+    fase (leitura, normalizacao, upsert, commit) vai para resumo['fases'] e /metrics.
+    """
+    progresso = progresso or (lambda fase, linhas: None)
+    resumo = {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+    if not os.path.exists(path):
+        resumo['errors'].append(f"Arquivo não encontrado: {path}")
+        current_app.logger.warning(resumo['errors'][-1])
         return resumo
 
-    for idx, row in df.iterrows():
-        try:
-            raw_data = row[col_data]
-            data_item = pd.to_datetime(raw_data, errors='coerce').date() if not pd.isna(raw_data) else date.today()
-            cliente_nome = str(row[col_cliente]).strip()
-            modelo = str(row[col_modelo]).strip()
-            quantidade = safe_parse_int_quantity(row[col_quant])
-            pronto_flag = parse_bool_pronto(row[col_pronto]) if col_pronto else False
-
-            if not cliente_nome or not modelo:
-                resumo['errors'].append(f"Linha {idx+2}: cliente ou modelo vazio. Pulando.")
-                continue
+    inalterado, assinatura = arquivo_inalterado(path)
+    if inalterado and not forcar:
+        resumo['arquivo_inalterado'] = True
+        return resumo
 
-            cliente = Cliente.query.filter_by(nome=cliente_nome).first()
-            if not cliente:
-                cliente = Cliente(nome=cliente_nome)
-                db.session.add(cliente)
-                db.session.flush()
-
-            status_text = 'Pronto' if pronto_flag else 'Recebido'
-            now = datetime.now()
-
-            item_status = ItemStatus.query.filter_by(modelo=modelo, data=data_item).first()
-            if item_status:
-                item_status.quantidade = quantidade
-                item_status.status = status_text
-                item_status.usuario_ultimo_update = 'importacao_automatica'
-                item_status.hora_ultimo_update = now
-                item_status.cliente = cliente.nome
-                resumo['updated'] += 1
-            else:
-                item_status = ItemStatus(
-                    cliente=cliente.nome,
-                    modelo=modelo,
-                    quantidade=quantidade,
-                    status=status_text,
-                    usuario_ultimo_update='importacao_automatica',
-                    hora_ultimo_update=now,
-                    data=data_item
-                )
-                db.session.add(item_status)
-                resumo['created'] += 1
-        except Exception as e:
-            resumo['errors'].append(f"Linha {idx+2}: erro - {e}")
-            current_app.logger.exception(f"Erro importando linha {idx+2}")
+    progresso('leitura', 0)
+    linhas_processadas = 0
+    fases = novas_fases()
+    try:
+        with ExitStack() as pilha:
+            with fase(fases, 'leitura'):  # abrir a planilha conta como leitura
+                leitor, cols = abrir_leitor(pilha, path, sheet_name, linha_cabecalho, motor)
+            if cols is None:
+                resumo['errors'].append("Colunas obrigatórias não encontradas (Data, Cliente, Modelo, Quantidade).")
+                current_app.logger.error(resumo['errors'][-1])
+                return resumo
+
+            vazia = True
+            for numeros, linhas in cronometrar(leitor.blocos(), fases, 'leitura'):
+                vazia = False
+                with fase(fases, 'normalizacao'):
+                    registros = registros_do_bloco(numeros, linhas, cols, resumo)
+                with fase(fases, 'upsert'):
+                    upsert_item_status(registros, resumo)
+                linhas_processadas += len(linhas)
+                progresso('gravacao', linhas_processadas)
+    except Exception as e:
+        db.session.rollback()
+        resumo['errors'].append(f"Erro ao importar planilha: {e}")
+        current_app.logger.exception("Erro importando planilha")
+        return resumo
+
+    if vazia:
+        resumo['errors'].append("Planilha vazia.")
+        return resumo
 
+    progresso('commit', linhas_processadas)
     try:
-        db.session.commit()
+        with fase(fases, 'commit'):
+            registrar_arquivo(path, assinatura)
+            db.session.commit()
     except Exception as e:
+        db.session.rollback()
         resumo['errors'].append(f"Erro no commit do DB: {e}")
         current_app.logger.exception("Erro no commit final")
+    registrar_fases_importacao(fases)
+    resumo['fases'] = {nome: round(segundos, 3) for nome, segundos in fases.items()}
     return resumo
+
+# ==========================
+# Várias planilhas (análise em paralelo, um único gravador)
+# ==========================
+def planilhas_configuradas():
+    """Lista de planilhas de PCP_PLANILHAS: dicts com caminho, aba, linha_cabecalho e motor."""
+    planilhas = current_app.config.get('PCP_PLANILHAS') or [{'caminho': PLANILHA_CAMINHO, 'aba': PLANILHA_ABA}]
+    motor = current_app.config.get('PCP_MOTOR_IMPORTACAO', 'padrao')
+    return [{'caminho': p['caminho'], 'aba': p.get('aba', PLANILHA_ABA),
+             'linha_cabecalho': p.get('linha_cabecalho'), 'motor': p.get('motor', motor)} for p in planilhas]
+
+def analisar_planilha(path, sheet_name=PLANILHA_ABA, linha_cabecalho=None, motor='padrao'):
+    """Lê e normaliza uma planilha inteira sem tocar no banco (roda num processo do pool).
+
+    Retorna {'colunas', 'linhas', 'errors', 'fases'}. `colunas` traz um array por
+    campo (data em datetime64[D], quantidade em int64, textos como objetos), bem
+    mais compacto para voltar ao processo principal do que uma lista de dicts.
+    """
+    import numpy as np
+    import pandas as pd
+    fases = novas_fases()
+    resultado = {'colunas': None, 'linhas': 0, 'errors': [], 'fases': fases}
+    partes = []
+    with ExitStack() as pilha:
+        with fase(fases, 'leitura'):
+            leitor, cols = abrir_leitor(pilha, path, sheet_name, linha_cabecalho, motor)
+        if cols is None:
+            resultado['errors'].append("Colunas obrigatórias não encontradas (Data, Cliente, Modelo, Quantidade).")
+            return resultado
+        for numeros, linhas in cronometrar(leitor.blocos(), fases, 'leitura'):
+            with fase(fases, 'normalizacao'):
+                partes.append(normalizar_bloco(numeros, linhas, cols, resultado['errors']))
+            resultado['linhas'] += len(linhas)
+
+    with fase(fases, 'normalizacao'):
+        if partes:
+            df = pd.concat(partes)
+            resultado['colunas'] = {
+                'data': pd.to_datetime(df['data']).to_numpy().astype('datetime64[D]'),
+                'cliente': df['cliente'].to_numpy(dtype=object),
+                'modelo': df['modelo'].to_numpy(dtype=object),
+                'quantidade': df['quantidade'].to_numpy(dtype=np.int64),
+                'status': df['status'].to_numpy(dtype=object),
+            }
+    resultado['fases'] = dict(fases)
+    return resultado
+
+def registros_das_colunas(colunas, inicio, fim):
+    """Registros para o upsert a partir das colunas de analisar_planilha, no intervalo [inicio, fim)."""
+    return [
+        {'data': d, 'cliente': c, 'modelo': m, 'quantidade': q, 'status': st}
+        for d, c, m, q, st in zip(
+            colunas['data'][inicio:fim].astype(object).tolist(),
+            colunas['cliente'][inicio:fim].tolist(),
+            colunas['modelo'][inicio:fim].tolist(),
+            colunas['quantidade'][inicio:fim].tolist(),
+            colunas['status'][inicio:fim].tolist(),
+        )
+    ]
+
+def _resumo_vazio():
+    return {'created': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+
+def _mesclar_resumos(por_arquivo):
+    """Resumo total com o detalhe de cada arquivo em resumo['arquivos'].
+
+    resumo['arquivo_inalterado'] só quando todos os arquivos foram pulados.
+    """
+    total = _resumo_vazio()
+    for caminho, r in por_arquivo.items():
+        for chave in ('created', 'updated', 'unchanged'):
+            total[chave] += r.get(chave, 0)
+        total['errors'].extend(f"{os.path.basename(caminho)}: {e}" for e in r['errors'])
+    if por_arquivo and all(r.get('arquivo_inalterado') for r in por_arquivo.values()):
+        total['arquivo_inalterado'] = True
+    total['arquivos'] = por_arquivo
+    return total
+
+def importar_planilhas(planilhas=None, forcar=False, progresso=None, processos=None):
+    """Importa várias planilhas para ItemStatus numa única transação e retorna o resumo mesclado.
+
+    `planilhas` (padrão: planilhas_configuradas()) é uma lista de dicts com caminho,
+    aba, linha_cabecalho e motor. Cada planilha alterada é lida e normalizada em um
+    processo do pool (IMPORTACAO_PROCESSOS); o processo atual é o único que grava,
+    na ordem da lista: se duas planilhas trazem o mesmo modelo e data, vale a
+    última. Com uma planilha só, ou um processo só, tudo roda aqui mesmo.
+
+    Com uma planilha só o resumo é o de importar_planilha (com 'fases' e
+    'arquivo_inalterado'); com várias, o total tem o detalhe por arquivo em
+    'arquivos', 'fases' da gravação e 'arquivo_inalterado' se todas foram puladas.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    planilhas = planilhas or planilhas_configuradas()
+    progresso = progresso or (lambda fase, linhas: None)
+    processos = processos or current_app.config.get('IMPORTACAO_PROCESSOS', 1)
+
+    if len(planilhas) == 1:
+        p = planilhas[0]
+        return importar_planilha(p['caminho'], p['aba'], forcar, progresso,
+                                 p.get('linha_cabecalho'), p.get('motor', 'padrao'))
+
+    por_arquivo, pendentes = {}, []
+    for p in planilhas:
+        resumo = por_arquivo[p['caminho']] = _resumo_vazio()
+        if not os.path.exists(p['caminho']):
+            resumo['errors'].append(f"Arquivo não encontrado: {p['caminho']}")
+            current_app.logger.warning(resumo['errors'][-1])
+            continue
+        inalterado, assinatura = arquivo_inalterado(p['caminho'])
+        if inalterado and not forcar:
+            resumo['arquivo_inalterado'] = True
+            continue
+        pendentes.append((p, assinatura))
+    if not pendentes:
+        return _mesclar_resumos(por_arquivo)
+
+    progresso('leitura', 0)
+    fases = novas_fases()
+    linhas_processadas = 0
+    pool = None
+    if processos > 1 and len(pendentes) > 1:
+        # spawn: os processos filhos não herdam conexões do banco nem as threads do app
+        pool = ProcessPoolExecutor(max_workers=min(processos, len(pendentes)),
+                                   mp_context=multiprocessing.get_context('spawn'))
+    try:
+        if pool:
+            analises = [pool.submit(analisar_planilha, p['caminho'], p['aba'],
+                                    p.get('linha_cabecalho'), p.get('motor', 'padrao'))
+                        for p, _ in pendentes]
+            obter = lambda i: analises[i].result()
+        else:
+            obter = lambda i: analisar_planilha(pendentes[i][0]['caminho'], pendentes[i][0]['aba'],
+                                                pendentes[i][0].get('linha_cabecalho'),
+                                                pendentes[i][0].get('motor', 'padrao'))
+
+        # grava na ordem configurada, começando assim que a primeira análise termina
+        for i, (p, assinatura) in enumerate(pendentes):
+            resumo = por_arquivo[p['caminho']]
+            try:
+                analise = obter(i)
+            except Exception as e:
+                resumo['errors'].append(f"Erro ao ler planilha: {e}")
+                current_app.logger.exception("Erro lendo planilha %s", p['caminho'])
+                continue
+            resumo['errors'].extend(analise['errors'])
+            resumo['fases'] = {nome: round(s, 3) for nome, s in analise['fases'].items()}
+            registrar_fases_importacao(analise['fases'])
+            colunas = analise['colunas']
+            if colunas is None:
+                if not analise['errors']:
+                    resumo['errors'].append("Planilha vazia.")
+                continue
+
+            total = len(colunas['modelo'])
+            with fase(fases, 'upsert'):
+                for inicio in range(0, total, TAMANHO_BLOCO):
+                    upsert_item_status(registros_das_colunas(colunas, inicio, inicio + TAMANHO_BLOCO), resumo)
+                    progresso('gravacao', linhas_processadas + min(inicio + TAMANHO_BLOCO, total))
+                registrar_arquivo(p['caminho'], assinatura)
+            linhas_processadas += analise['linhas']
+
+        progresso('commit', linhas_processadas)
+        with fase(fases, 'commit'):
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Erro gravando as planilhas")
+        for p, _ in pendentes:
+            por_arquivo[p['caminho']]['errors'].append(f"Importação desfeita: {e}")
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    registrar_fases_importacao(fases)
+    total = _mesclar_resumos(por_arquivo)
+    total['fases'] = {nome: round(s, 3) for nome, s in fases.items()}
+    return total
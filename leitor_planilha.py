@@ -0,0 +1,168 @@
+# leitor_planilha.py
+# openpyxl e pandas são importados só ao abrir uma planilha (inicialização leve)
+EXT_STREAMING = {'xlsx', 'xlsm'}
+TAMANHO_BLOCO = 5000
+
+def clean_header_name(h, i):
+    """Limpa o nome de uma coluna; colunas sem nome viram col_<n>."""
+    if h is None or str(h).strip() == '':
+        return f"col_{i+1}"
+    return str(h).strip().replace("\u00a0", " ")
+
+def _limpar_celula(v):
+    if isinstance(v, str):
+        v = v.strip()
+        return v or None
+    return v
+
+def suporta_streaming(path):
+    return path.rsplit('.', 1)[-1].lower() in EXT_STREAMING
+
+class LeitorPlanilha:
+    """Lê uma aba de planilha em blocos, sem montar a planilha inteira em memória.
+
+    Usa o modo read-only do openpyxl (.xlsx/.xlsm). Formatos antigos (.xls) caem
+    para o pandas, que precisa carregar a aba inteira.
+
+        with LeitorPlanilha(path, 'Plan1') as leitor:
+            leitor.colunas
+            for numeros, linhas in leitor.blocos():
+                ...
+
+    Cada bloco traz os números das linhas no Excel e as linhas como listas
+    alinhadas com `colunas`, já com textos aparados e linhas vazias descartadas.
+    """
+
+    LINHA_CABECALHO = 1
+
+    def __init__(self, path, sheet_name=None, linha_cabecalho=None):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.linha_cabecalho = linha_cabecalho or self.LINHA_CABECALHO
+        self.colunas = []
+        self._wb = None
+        self._linhas = None
+
+    def __enter__(self):
+        if suporta_streaming(self.path):
+            from openpyxl import load_workbook
+            self._wb = load_workbook(self.path, read_only=True, data_only=True, keep_links=False)
+            ws = self._wb[self.sheet_name] if self.sheet_name else self._wb.worksheets[0]
+            self._linhas = ws.iter_rows(min_row=self.linha_cabecalho, values_only=True)
+        else:
+            self._linhas = self._linhas_pandas()
+        cabecalho = next(self._linhas, None) or ()
+        while cabecalho and cabecalho[-1] is None:
+            cabecalho = cabecalho[:-1]
+        self.colunas = [clean_header_name(h, i) for i, h in enumerate(cabecalho)]
+        return self
+
+    def __exit__(self, *exc):
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+        return False
+
+    def _linhas_pandas(self, usecols=None):
+        import pandas as pd
+        df = pd.read_excel(self.path, sheet_name=self.sheet_name or 0, header=None,
+                           skiprows=self.linha_cabecalho - 1, usecols=usecols)
+        df = df.astype(object).where(df.notna(), None)
+        yield from df.itertuples(index=False, name=None)
+
+    def linhas(self):
+        """Itera (numero_linha_excel, valores) das linhas de dados não vazias."""
+        n_cols = len(self.colunas)
+        numero = self.linha_cabecalho
+        for valores in self._linhas:
+            numero += 1
+            valores = [_limpar_celula(v) for v in valores[:n_cols]]
+            if all(v is None for v in valores):
+                continue
+            if len(valores) < n_cols:
+                valores += [None] * (n_cols - len(valores))
+            yield numero, valores
+
+    def blocos(self, tamanho=TAMANHO_BLOCO):
+        numeros, linhas = [], []
+        for numero, valores in self.linhas():
+            numeros.append(numero)
+            linhas.append(valores)
+            if len(linhas) >= tamanho:
+                yield numeros, linhas
+                numeros, linhas = [], []
+        if linhas:
+            yield numeros, linhas
+
+def _celula_layout(v):
+    """Valor da célula como o xlwings entrega: texto aparado e todo número como float."""
+    if isinstance(v, str):
+        return v.strip()
+    if type(v) is int:
+        # o Excel guarda números como double: um código 123 vira "123.0" como texto,
+        # igual ao que o caminho xlwings já gravou no banco
+        return float(v)
+    return v
+
+class LeitorLayoutPCP(LeitorPlanilha):
+    """Lê a aba no layout real da planilha PCP, como importer_xlwings, mas sem abrir o Excel.
+
+    Cabeçalho em B6:H6 e dados de B7 até a última linha com a coluna B
+    preenchida; colunas fora de B:H são ignoradas. Células vazias herdam o valor
+    da linha de cima (células mescladas), como o ffill do caminho xlwings; os
+    valores vêm como o xlwings os entrega (_celula_layout).
+
+    Tudo numa passada só: linhas com a coluna B vazia ficam em espera até
+    aparecer outra com B preenchida; as que sobram no fim estão abaixo da última
+    linha e são descartadas, sem precisar ler a aba antes para achar o fim.
+    """
+
+    LINHA_CABECALHO = 6
+    PRIMEIRA_COLUNA = 2  # B
+    ULTIMA_COLUNA = 8    # H
+
+    def __enter__(self):
+        largura = self.ULTIMA_COLUNA - self.PRIMEIRA_COLUNA + 1
+        if suporta_streaming(self.path):
+            from openpyxl import load_workbook
+            self._wb = load_workbook(self.path, read_only=True, data_only=True, keep_links=False)
+            ws = self._wb[self.sheet_name] if self.sheet_name else self._wb.worksheets[0]
+            self._linhas = ws.iter_rows(min_row=self.linha_cabecalho, min_col=self.PRIMEIRA_COLUNA,
+                                        max_col=self.ULTIMA_COLUNA, values_only=True)
+        else:
+            self._linhas = self._linhas_pandas(usecols=range(self.PRIMEIRA_COLUNA - 1, self.ULTIMA_COLUNA))
+        cabecalho = list(next(self._linhas, None) or ())[:largura]
+        cabecalho += [None] * (largura - len(cabecalho))
+        self.colunas = [clean_header_name(h, i) for i, h in enumerate(cabecalho)]
+        return self
+
+    def linhas(self):
+        """Itera (numero_linha_excel, valores) das linhas de dados, já com o ffill aplicado."""
+        largura = len(self.colunas)
+        anterior = [None] * largura
+        em_espera = []  # (numero, valores) com B vazia depois da última B preenchida
+        numero = self.linha_cabecalho
+        for valores in self._linhas:
+            numero += 1
+            valores = list(valores[:largura])
+            valores += [None] * (largura - len(valores))
+            if valores[0] is None:
+                # linha totalmente vazia não precisa ser guardada: vira cópia da anterior
+                em_espera.append((numero, None if all(v is None for v in valores) else valores))
+                continue
+            em_espera.append((numero, valores))
+            for n, vals in em_espera:
+                if vals is not None:
+                    anterior = [a if v is None else _celula_layout(v) for v, a in zip(vals, anterior)]
+                yield n, list(anterior)
+            em_espera = []
+
+def ler_preview(path, sheet_name=None, n=10, linha_cabecalho=1):
+    """Lê só o cabeçalho e as primeiras `n` linhas. Retorna (colunas, linhas como dicts)."""
+    preview = []
+    with LeitorPlanilha(path, sheet_name, linha_cabecalho) as leitor:
+        for _, valores in leitor.linhas():
+            preview.append(dict(zip(leitor.colunas, valores)))
+            if len(preview) >= n:
+                break
+        return leitor.colunas, preview
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 from flask_login import login_required, current_user
-from models import db, Item, ItemHistory
+from models import db
+from transicoes import transicionar_itens
 
 logistica_bp = Blueprint('logistica', __name__, url_prefix='/logistica')
 
@@ -10,14 +11,10 @@ def atualizar_status(item_id, novo_status):
     if current_user.role not in ['logistica', 'admin']:
         return jsonify({'erro': 'Acesso negado'}), 403
 
-    item = Item.query.get_or_404(item_id)
-    antigo = item.status
-    item.status = novo_status
+    resultado = transicionar_itens([item_id], novo_status, current_user.id)[0]
+    if not resultado['ok']:
+        db.session.rollback()
+        return jsonify({'erro': resultado['msg']}), 404 if resultado['msg'] == 'Item não encontrado' else 409
     db.session.commit()
 
-    hist = ItemHistory(item_id=item.id, from_status=antigo,
-                       to_status=novo_status, by_user_id=current_user.id)
-    db.session.add(hist)
-    db.session.commit()
-
-    return jsonify({'ok': True, 'novo_status': item.status})
+    return jsonify({'ok': True, 'novo_status': resultado['status']})
@@ -0,0 +1,210 @@
+# metricas.py
+"""Métricas de desempenho no formato texto do Prometheus (/metrics).
+
+- Requisições: latência por endpoint (histograma) e contagem por status.
+- SQL: consultas e tempo por endpoint, via eventos do engine. Fora de
+  requisição (jobs de importação, agendador) entram como 'segundo_plano'.
+- Importação: tempo de cada fase de importar_planilha (leitura, normalizacao,
+  upsert, commit).
+
+Requisições acima de METRICAS_REQUISICAO_LENTA_MS vão para o log com as
+consultas mais pesadas. Os valores são do processo: com vários workers, cada
+um expõe os seus e o Prometheus agrega.
+"""
+import heapq
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from flask import Blueprint, Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+BUCKETS_FASE = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300)
+CONSULTAS_NO_LOG = 5
+ENDPOINT_FORA = 'segundo_plano'
+
+metricas_bp = Blueprint('metricas', __name__)
+
+# ==========================
+# Registro
+# ==========================
+class Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.contagens = [0] * len(buckets)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.contagens[i] += 1
+        self.soma += valor
+        self.total += 1
+
+_lock = threading.Lock()
+_contadores = {}   # nome -> {labels: valor}
+_histogramas = {}  # nome -> {labels: Histograma}
+_ajuda = {}
+
+def _definir(nome, tipo, ajuda, buckets=None):
+    _ajuda[nome] = (tipo, ajuda, buckets)
+    (_histogramas if tipo == 'histogram' else _contadores)[nome] = {}
+
+_definir('pcp_http_requisicoes_total', 'counter', 'Requisições HTTP por endpoint, método e status')
+_definir('pcp_http_requisicao_segundos', 'histogram', 'Latência das requisições por endpoint', BUCKETS_LATENCIA)
+_definir('pcp_sql_consultas_total', 'counter', 'Comandos SQL executados por endpoint')
+_definir('pcp_sql_segundos_total', 'counter', 'Tempo gasto em SQL por endpoint')
+_definir('pcp_sql_consultas_por_requisicao', 'histogram', 'Comandos SQL por requisição', BUCKETS_CONSULTAS)
+_definir('pcp_importacao_fase_segundos', 'histogram', 'Duração das fases da importação da planilha', BUCKETS_FASE)
+
+def incrementar(nome, labels, valor=1):
+    with _lock:
+        serie = _contadores[nome]
+        serie[labels] = serie.get(labels, 0) + valor
+
+def observar(nome, labels, valor):
+    with _lock:
+        serie = _histogramas[nome]
+        if labels not in serie:
+            serie[labels] = Histograma(_ajuda[nome][2])
+        serie[labels].observar(valor)
+
+# ==========================
+# Fases da importação
+# ==========================
+@contextmanager
+def fase(fases, nome):
+    """Soma em fases[nome] o tempo gasto dentro do bloco."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fases[nome] += time.perf_counter() - inicio
+
+def cronometrar(iteravel, fases, nome):
+    """Itera `iteravel` somando em fases[nome] o tempo gasto para obter cada item."""
+    iterador = iter(iteravel)
+    while True:
+        with fase(fases, nome):
+            item = next(iterador, StopIteration)
+        if item is StopIteration:
+            return
+        yield item
+
+def novas_fases():
+    return defaultdict(float)
+
+def registrar_fases_importacao(fases):
+    for nome, segundos in fases.items():
+        observar('pcp_importacao_fase_segundos', (('fase', nome),), segundos)
+
+# ==========================
+# SQL (eventos do engine)
+# ==========================
+# O início fica no contexto de execução do comando, não na conexão: um comando que
+# falha não dispara after_cursor_execute e não pode deixar sobra para os próximos.
+def _antes_do_comando(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metricas_inicio = time.perf_counter()
+
+def _depois_do_comando(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_metricas_inicio', None)
+    if inicio is None:
+        return
+    duracao = time.perf_counter() - inicio
+    if has_request_context() and 'metricas' in g:
+        dados = g.metricas
+        dados['consultas'] += 1
+        dados['sql_segundos'] += duracao
+        # guarda só as mais pesadas (heap mínimo de tamanho fixo)
+        item = (duracao, dados['consultas'], statement)
+        if len(dados['pesadas']) < CONSULTAS_NO_LOG:
+            heapq.heappush(dados['pesadas'], item)
+        else:
+            heapq.heappushpop(dados['pesadas'], item)
+    else:
+        # fora de requisição ou depois dela (respostas em streaming)
+        labels = (('endpoint', (request.endpoint if has_request_context() else None) or ENDPOINT_FORA),)
+        incrementar('pcp_sql_consultas_total', labels)
+        incrementar('pcp_sql_segundos_total', labels, duracao)
+
+# ==========================
+# Requisições (hooks do Flask)
+# ==========================
+def _inicio_requisicao():
+    g.metricas = {'inicio': time.perf_counter(), 'consultas': 0, 'sql_segundos': 0.0, 'pesadas': []}
+
+def _fim_requisicao(resp):
+    dados = g.pop('metricas', None)
+    if dados is None:
+        return resp
+    duracao = time.perf_counter() - dados['inicio']
+    endpoint = request.endpoint or 'desconhecido'
+    por_endpoint = (('endpoint', endpoint),)
+
+    incrementar('pcp_http_requisicoes_total',
+                (('endpoint', endpoint), ('metodo', request.method), ('status', str(resp.status_code))))
+    observar('pcp_http_requisicao_segundos', por_endpoint, duracao)
+    incrementar('pcp_sql_consultas_total', por_endpoint, dados['consultas'])
+    incrementar('pcp_sql_segundos_total', por_endpoint, dados['sql_segundos'])
+    observar('pcp_sql_consultas_por_requisicao', por_endpoint, dados['consultas'])
+
+    limite_ms = current_app.config.get('METRICAS_REQUISICAO_LENTA_MS', 1000)
+    if limite_ms and duracao * 1000 >= limite_ms:
+        pesadas = '\n'.join(
+            f"  {d * 1000:.1f} ms: {' '.join(sql.split())[:300]}"
+            for d, _, sql in sorted(dados['pesadas'], reverse=True)
+        )
+        current_app.logger.warning(
+            "Requisição lenta: %s %s (%s) %.0f ms, %d consultas SQL em %.0f ms\n%s",
+            request.method, request.path, endpoint, duracao * 1000,
+            dados['consultas'], dados['sql_segundos'] * 1000, pesadas,
+        )
+    return resp
+
+def instrumentar(app):
+    """Liga os eventos do engine e os hooks de requisição. Chamar dentro do app context."""
+    event.listen(db.engine, 'before_cursor_execute', _antes_do_comando)
+    event.listen(db.engine, 'after_cursor_execute', _depois_do_comando)
+    app.before_request(_inicio_requisicao)
+    app.after_request(_fim_requisicao)
+
+# ==========================
+# Exposição
+# ==========================
+def _formatar_labels(labels, extra=()):
+    pares = list(labels) + list(extra)
+    if not pares:
+        return ''
+    escapar = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escapar(v)}"' for k, v in pares) + '}'
+
+def texto_prometheus():
+    linhas = []
+    with _lock:
+        for nome, (tipo, ajuda, buckets) in _ajuda.items():
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            if tipo == 'histogram':
+                for labels, h in sorted(_histogramas[nome].items()):
+                    for limite, contagem in zip(h.buckets, h.contagens):
+                        linhas.append(f"{nome}_bucket{_formatar_labels(labels, [('le', limite)])} {contagem}")
+                    linhas.append(f"{nome}_bucket{_formatar_labels(labels, [('le', '+Inf')])} {h.total}")
+                    linhas.append(f"{nome}_sum{_formatar_labels(labels)} {h.soma}")
+                    linhas.append(f"{nome}_count{_formatar_labels(labels)} {h.total}")
+            else:
+                for labels, valor in sorted(_contadores[nome].items()):
+                    linhas.append(f"{nome}{_formatar_labels(labels)} {valor}")
+    return '\n'.join(linhas) + '\n'
+
+@metricas_bp.route('/metrics')
+def metrics():
+    """Métricas em texto do Prometheus. Com METRICAS_TOKEN definido, exige 'Authorization: Bearer <token>'."""
+    token = current_app.config.get('METRICAS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Acesso negado\n', status=403, mimetype='text/plain')
+    return Response(texto_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,170 @@
+# migracoes.py
+import sys
+from sqlalchemy import inspect, text
+from models import db
+from banco import configurar_engine
+from agregados import reconstruir_agregados
+from cache_clientes import chave_cliente
+
+# Colunas adicionadas depois da criação do app.db: (tabela, coluna, DDL)
+COLUNAS_NOVAS = [
+    ('item_status', 'fingerprint', 'VARCHAR(40)'),
+    ('item_status', 'versao', 'INTEGER'),
+    ('item_status', 'recebido_em', 'DATETIME'),
+    ('item_history', 'item_status_id', 'INTEGER REFERENCES item_status (id)'),
+    ('pcp_upload', 'arquivo', 'VARCHAR(80)'),
+    ('cliente', 'chave', 'VARCHAR(120)'),
+]
+
+# Consultas quentes e o índice que cada uma deve usar (conferido por verificar_planos)
+CONSULTAS_QUENTES = [
+    ('dashboard por data',
+     "SELECT * FROM item_status WHERE data = '2024-01-01'",
+     'uq_item_status_data_modelo'),
+    ('update_status por modelo e data',
+     "SELECT * FROM item_status WHERE modelo = 'X' AND data = '2024-01-01'",
+     'uq_item_status_data_modelo'),
+    ('painel por período (cursor)',
+     "SELECT * FROM item_status WHERE data BETWEEN '2024-01-01' AND '2024-01-31' "
+     "AND (data > '2024-01-05' OR (data = '2024-01-05' AND modelo > 'X')) ORDER BY data, modelo LIMIT 201",
+     'uq_item_status_data_modelo'),
+    ('cliente por nome',
+     "SELECT * FROM cliente WHERE nome = 'X'",
+     'uq_cliente_nome'),
+    ('cliente por chave normalizada',
+     "SELECT id, nome FROM cliente WHERE chave IN ('x', 'y')",
+     'uq_cliente_chave'),
+    ('histórico por item',
+     "SELECT * FROM item_history WHERE item_id = 1 ORDER BY criado_em",
+     'ix_item_history_item_criado'),
+    ('histórico por item do painel',
+     "SELECT * FROM item_history WHERE item_status_id = 1 ORDER BY criado_em",
+     'ix_item_history_item_status_criado'),
+    ('analytics por período',
+     "SELECT * FROM resumo_diario WHERE data BETWEEN '2024-01-01' AND '2024-01-31'",
+     'uq_resumo_diario_data_cliente_status'),
+]
+
+def adicionar_colunas_faltantes():
+    insp = inspect(db.engine)
+    tabelas = set(insp.get_table_names())
+    with db.engine.begin() as conn:
+        for tabela, coluna, ddl in COLUNAS_NOVAS:
+            if tabela not in tabelas:
+                continue
+            if coluna not in {c['name'] for c in insp.get_columns(tabela)}:
+                conn.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {ddl}'))
+
+def remover_duplicados():
+    """Elimina colisões que impediriam os índices únicos.
+
+    ItemStatus: por (data, modelo) fica a linha atualizada por último (maior id no empate).
+    Cliente: por nome fica o de menor id, e os Items dos duplicados passam para ele.
+    Retorna {tabela: linhas removidas}.
+    """
+    removidos = {}
+    with db.engine.begin() as conn:
+        removidos['item_status'] = conn.execute(text("""
+            DELETE FROM item_status WHERE id NOT IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY data, modelo
+                        ORDER BY hora_ultimo_update DESC NULLS LAST, id DESC
+                    ) AS n FROM item_status
+                ) AS t WHERE n = 1
+            )
+        """)).rowcount
+        conn.execute(text("""
+            UPDATE item SET cliente_id = (
+                SELECT MIN(c2.id) FROM cliente c1 JOIN cliente c2 ON c2.nome = c1.nome
+                WHERE c1.id = item.cliente_id
+            ) WHERE cliente_id IS NOT NULL
+        """))
+        removidos['cliente'] = conn.execute(text("""
+            DELETE FROM cliente WHERE id NOT IN (SELECT MIN(id) FROM cliente GROUP BY nome)
+        """)).rowcount
+    return removidos
+
+def unificar_clientes_por_chave():
+    """Preenche cliente.chave e junta os clientes com a mesma chave ("ACME", "Acme ").
+
+    Fica o de menor id; os Items dos demais passam para ele. Retorna quantos saíram.
+    """
+    with db.engine.begin() as conn:
+        clientes = conn.execute(text("SELECT id, nome FROM cliente ORDER BY id")).all()
+        manter, trocas = {}, []
+        for id_, nome in clientes:
+            chave = chave_cliente(nome)
+            if chave in manter:
+                trocas.append({'de': id_, 'para': manter[chave]})
+            else:
+                manter[chave] = id_
+        if trocas:
+            conn.execute(text("UPDATE item SET cliente_id = :para WHERE cliente_id = :de"), trocas)
+            conn.execute(text("DELETE FROM cliente WHERE id = :de"), [{'de': t['de']} for t in trocas])
+        if manter:
+            conn.execute(text("UPDATE cliente SET chave = :chave WHERE id = :id"),
+                         [{'chave': c, 'id': i} for c, i in manter.items()])
+    return len(trocas)
+
+def criar_indices():
+    """Cria os índices declarados nos modelos que ainda não existem no banco."""
+    with db.engine.begin() as conn:
+        for tabela in db.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                indice.create(conn, checkfirst=True)
+
+def verificar_planos():
+    """Confere com EXPLAIN QUERY PLAN (SQLite) que as consultas quentes usam os índices.
+
+    Retorna [(descrição, índice esperado, plano, ok)].
+    """
+    resultado = []
+    with db.engine.connect() as conn:
+        for descricao, sql, indice in CONSULTAS_QUENTES:
+            plano = ' | '.join(r[-1] for r in conn.execute(text('EXPLAIN QUERY PLAN ' + sql)))
+            resultado.append((descricao, indice, plano, indice in plano))
+    return resultado
+
+def indices_existentes():
+    insp = inspect(db.engine)
+    return {i['name'] for t in insp.get_table_names() for i in insp.get_indexes(t)}
+
+def aplicar_migracoes():
+    """Cria tabelas novas e ajusta o esquema de bancos já existentes (ex.: app.db).
+
+    A remoção de duplicados (e a junção de clientes pela chave normalizada) só roda
+    enquanto os índices únicos ainda não existem; os agregados diários são
+    preenchidos quando a tabela é criada.
+    """
+    sem_agregados = 'resumo_diario' not in inspect(db.engine).get_table_names()
+    db.create_all()
+    adicionar_colunas_faltantes()
+    removidos = {}
+    if not {'uq_item_status_data_modelo', 'uq_cliente_nome'} <= indices_existentes():
+        removidos = remover_duplicados()
+    if 'uq_cliente_chave' not in indices_existentes():
+        removidos['cliente_chave'] = unificar_clientes_por_chave()
+    criar_indices()
+    if sem_agregados:
+        reconstruir_agregados()
+        db.session.commit()
+    db.engine.dispose()  # conexões do pool abertas antes dos índices não os enxergam nos planos
+    return removidos
+
+if __name__ == '__main__':
+    from flask import Flask
+    from config import Config
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    with app.app_context():
+        configurar_engine(app)
+        removidos = aplicar_migracoes()
+        print(f"Migrações aplicadas. Duplicados removidos: {removidos}")
+        if '--planos' in sys.argv:
+            falhas = 0
+            for descricao, indice, plano, ok in verificar_planos():
+                print(f"[{'ok' if ok else 'FALHA'}] {descricao}: {plano}")
+                falhas += not ok
+            sys.exit(1 if falhas else 0)
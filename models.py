@@ -27,6 +27,10 @@ class User(UserMixin, db.Model):
 # Status dos itens (dashboard)
 # ==========================
 class ItemStatus(db.Model):
+    __table_args__ = (
+        # um modelo por data; também atende filtros só por data (dashboard)
+        db.Index('uq_item_status_data_modelo', 'data', 'modelo', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     cliente = db.Column(db.String(200), nullable=False)
     modelo = db.Column(db.String(100), nullable=False)
@@ -35,6 +39,9 @@ class ItemStatus(db.Model):
     usuario_ultimo_update = db.Column(db.String(100))
     hora_ultimo_update = db.Column(db.DateTime)
     data = db.Column(db.Date, nullable=False, default=datetime.today)
+    fingerprint = db.Column(db.String(40))  # hash do conteúdo da linha na planilha
+    versao = db.Column(db.Integer)  # versão da data (contador_versao) na última gravação
+    recebido_em = db.Column(db.DateTime)  # UTC; quando a importação criou a linha (início do lead time)
 
     def to_dict(self):
         return {
@@ -52,8 +59,13 @@ class ItemStatus(db.Model):
 # ==========================
 class Cliente(db.Model):
     __tablename__ = 'cliente'
+    __table_args__ = (
+        db.Index('uq_cliente_nome', 'nome', unique=True),
+        db.Index('uq_cliente_chave', 'chave', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(120), nullable=False)
+    chave = db.Column(db.String(120))  # nome normalizado (cache_clientes.chave_cliente)
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
 
 # ==========================
@@ -63,6 +75,7 @@ class PCPUpload(db.Model):
     __tablename__ = 'pcp_upload'
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(200))
+    arquivo = db.Column(db.String(80))  # <sha256>.<ext> na pasta de uploads (cache_uploads.py)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'))
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -85,10 +98,118 @@ class Item(db.Model):
 # ==========================
 class ItemHistory(db.Model):
     __tablename__ = 'item_history'
+    __table_args__ = (
+        db.Index('ix_item_history_item_criado', 'item_id', 'criado_em'),
+        db.Index('ix_item_history_item_status_criado', 'item_status_id', 'criado_em'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(db.Integer, db.ForeignKey('item.id'))
+    item_status_id = db.Column(db.Integer, db.ForeignKey('item_status.id'))  # alterações feitas no painel
     from_status = db.Column(db.String(50))
     to_status = db.Column(db.String(50))
     by_user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     comment = db.Column(db.String(250))
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# ==========================
+# Controle de arquivos importados
+# ==========================
+class ArquivoImportado(db.Model):
+    __tablename__ = 'arquivo_importado'
+    id = db.Column(db.Integer, primary_key=True)
+    caminho = db.Column(db.String(500), unique=True, nullable=False)
+    tamanho = db.Column(db.Integer)
+    mtime = db.Column(db.Float)
+    sha256 = db.Column(db.String(64))
+    importado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# ==========================
+# Jobs de importação da planilha
+# ==========================
+class ImportJob(db.Model):
+    __tablename__ = 'import_job'
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # pendente, executando, concluido, erro
+    fase = db.Column(db.String(50))
+    linhas_processadas = db.Column(db.Integer, default=0)
+    resumo = db.Column(db.Text)  # JSON
+    origem = db.Column(db.String(50))  # usuario, agendador, inicializacao
+    solicitado_por = db.Column(db.Integer, db.ForeignKey('user.id'))
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+    finalizado_em = db.Column(db.DateTime)
+
+class ImportLock(db.Model):
+    """Trava entre processos: só um job de importação roda por vez."""
+    __tablename__ = 'import_lock'
+    nome = db.Column(db.String(50), primary_key=True)
+    job_id = db.Column(db.Integer)
+    expira_em = db.Column(db.DateTime)
+
+# ==========================
+# Contadores de versão (invalidação de caches entre processos)
+# ==========================
+class ContadorVersao(db.Model):
+    __tablename__ = 'contador_versao'
+    chave = db.Column(db.String(100), primary_key=True)  # ex.: dashboard:2024-01-31
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+# ==========================
+# Agregados diários (analytics)
+# ==========================
+class ResumoDiario(db.Model):
+    """Itens e quantidade do painel por data, cliente e status (mantido por agregados.py)."""
+    __tablename__ = 'resumo_diario'
+    __table_args__ = (
+        db.Index('uq_resumo_diario_data_cliente_status', 'data', 'cliente', 'status', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Date, nullable=False)
+    cliente = db.Column(db.String(200), nullable=False)
+    status = db.Column(db.String(50), nullable=False)
+    itens = db.Column(db.Integer, nullable=False, default=0)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+
+class LeadTimeDiario(db.Model):
+    """Entregas concluídas por dia (UTC) e cliente, com a soma dos lead times desde "Recebido"."""
+    __tablename__ = 'lead_time_diario'
+    __table_args__ = (
+        db.Index('uq_lead_time_diario_data_cliente', 'data', 'cliente', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Date, nullable=False)
+    cliente = db.Column(db.String(200), nullable=False)
+    entregas = db.Column(db.Integer, nullable=False, default=0)
+    soma_segundos = db.Column(db.Float, nullable=False, default=0)
+
+# ==========================
+# Liderança entre processos (ex.: um único agendador)
+# ==========================
+class Lideranca(db.Model):
+    """Concessão com validade: o dono renova antes de expirar; expirada, outro processo assume."""
+    __tablename__ = 'lideranca'
+    nome = db.Column(db.String(50), primary_key=True)
+    dono = db.Column(db.String(120))  # host:pid:sufixo do processo
+    expira_em = db.Column(db.DateTime)
+
+# ==========================
+# Caixa de saída de e-mails
+# ==========================
+class EmailSaida(db.Model):
+    """Mensagem esperando envio pela thread de caixa_saida.py."""
+    __tablename__ = 'email_saida'
+    __table_args__ = (
+        db.Index('ix_email_saida_status_proxima', 'status', 'proxima_tentativa_em'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    destinatario = db.Column(db.String(200), nullable=False)
+    assunto = db.Column(db.String(200), nullable=False)
+    corpo = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # pendente, enviando, enviado, falhou
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa_em = db.Column(db.DateTime, default=datetime.utcnow)
+    reservado_por = db.Column(db.String(120))  # processo que está enviando (host:pid:sufixo)
+    reservado_ate = db.Column(db.DateTime)
+    ultimo_erro = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    enviado_em = db.Column(db.DateTime)
@@ -0,0 +1,111 @@
+# normalizacao.py
+"""Normalização vetorizada das linhas da planilha PCP.
+
+Usada por importer.py e importer_xlwings.py para que os dois interpretem
+quantidades, datas e a coluna "pronto" da mesma forma.
+"""
+from datetime import date
+import numpy as np
+import pandas as pd
+
+VALORES_PRONTO = {'sim', 's', 'yes', 'true', '1', 'ok', 'pronto'}
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+RE_MILHAR = r'^-?\d{1,3}(\.\d{3})+$'
+
+def normalizar_quantidade(serie):
+    """Converte a coluna de quantidade para inteiros.
+
+    Aceita números e textos no formato brasileiro ("1.234,5") ou com ponto
+    decimal ("12.5"). Retorna (quantidades, invalidas); células vazias e
+    inválidas viram 0, e `invalidas` marca as que tinham conteúdo não numérico.
+    """
+    serie = pd.Series(serie, dtype=object)
+    textos = serie.map(type) == str
+    valores = pd.to_numeric(serie.where(~textos), errors='coerce').astype('float64')
+
+    if textos.any():
+        s = serie[textos].str.strip().str.replace(' ', '', regex=False)
+        virgula = s.str.contains(',', regex=False)
+        milhar = ~virgula & s.str.match(RE_MILHAR)
+        s = s.where(~(virgula | milhar), s.str.replace('.', '', regex=False))
+        s = s.str.replace(',', '.', regex=False)
+        valores[textos] = pd.to_numeric(s, errors='coerce')
+
+    invalidas = valores.isna() & serie.notna()
+    quantidades = np.trunc(valores.fillna(0)).astype('int64')
+    return quantidades, invalidas
+
+def normalizar_pronto(serie):
+    """True quando o valor está em VALORES_PRONTO (sim, ok, 1, ...), sem diferenciar maiúsculas."""
+    serie = pd.Series(serie, dtype=object)
+    numeros = pd.to_numeric(serie.where(serie.map(type).isin([int, float])), errors='coerce')
+    textos = serie.astype(str).str.strip().str.lower()
+    return (textos.isin(VALORES_PRONTO) | (numeros == 1)) & serie.notna()
+
+def normalizar_data(serie, padrao=None):
+    """Converte a coluna de data para datetime.date numa só passada.
+
+    Aceita datas do Excel (datetime), números seriais do Excel e textos em
+    dd/mm/aaaa ou aaaa-mm-dd. Células vazias recebem `padrao` (hoje, se omitido).
+    Retorna (datas, invalidas).
+    """
+    padrao = padrao or date.today()
+    serie = pd.Series(serie, dtype=object)
+    resultado = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+
+    tipos = serie.map(type)
+    textos = tipos == str
+    numeros = tipos.isin([int, float]) & serie.notna()
+    outros = ~textos & ~numeros & serie.notna()
+
+    if textos.any():
+        s = serie[textos].str.strip()
+        convertidas = pd.to_datetime(s, format='%d/%m/%Y', errors='coerce')
+        convertidas = convertidas.fillna(pd.to_datetime(s, format='ISO8601', errors='coerce'))
+        restantes = convertidas.isna()
+        if restantes.any():
+            # datas com hora ou em formatos menos comuns: mantém dia/mês
+            convertidas[restantes] = pd.to_datetime(s[restantes], format='mixed', dayfirst=True, errors='coerce')
+        resultado[textos] = convertidas
+    if numeros.any():
+        dias = np.floor(pd.to_numeric(serie[numeros], errors='coerce').astype('float64'))
+        resultado[numeros] = EXCEL_EPOCH + pd.to_timedelta(dias, unit='D')
+    if outros.any():
+        resultado[outros] = pd.to_datetime(serie[outros], errors='coerce')
+
+    invalidas = resultado.isna() & serie.notna()
+    datas = resultado.dt.date.astype(object)
+    datas[resultado.isna()] = padrao
+    return datas, invalidas
+
+def normalizar_texto(serie):
+    serie = pd.Series(serie, dtype=object)
+    return serie.where(serie.notna(), '').astype(str).str.strip()
+
+def normalizar_frame(df, cols):
+    """Normaliza um bloco de linhas de uma vez.
+
+    `cols` mapeia 'data', 'cliente', 'modelo', 'quantidade' e, opcionalmente,
+    'pronto' para colunas de `df`. Retorna (normalizado, erros): `normalizado`
+    tem as colunas data, cliente, modelo, quantidade, status; `erros` é uma
+    Series com a mensagem de erro de cada linha (None quando a linha é válida).
+    """
+    datas, datas_invalidas = normalizar_data(df[cols['data']])
+    quantidades, _ = normalizar_quantidade(df[cols['quantidade']])
+    if cols.get('pronto') is not None:
+        pronto = normalizar_pronto(df[cols['pronto']])
+    else:
+        pronto = pd.Series(False, index=df.index)
+
+    normalizado = pd.DataFrame({
+        'data': datas,
+        'cliente': normalizar_texto(df[cols['cliente']]),
+        'modelo': normalizar_texto(df[cols['modelo']]),
+        'quantidade': quantidades,
+        'status': pronto.map({True: 'Pronto', False: 'Recebido'}),
+    }, index=df.index)
+
+    erros = pd.Series(None, index=df.index, dtype=object)
+    erros[datas_invalidas] = 'data inválida'
+    erros[(normalizado['cliente'] == '') | (normalizado['modelo'] == '')] = 'cliente ou modelo vazio'
+    return normalizado, erros
@@ -1,35 +1,42 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-import pandas as pd
+from sqlalchemy import insert
 import os
-from models import db, Cliente, Item, PCPUpload, ItemHistory
+import time
+from models import db, Item, PCPUpload, ItemHistory
+from cache_uploads import salvar_upload, TabelaUpload
+from importer import carregar_clientes
 
 pcp_bp = Blueprint('pcp', __name__, url_prefix='/pcp')
-ALLOWED_EXT = {'xls', 'xlsx'}
+ALLOWED_EXT = {'xls', 'xlsx', 'xlsm'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.',1)[1].lower() in ALLOWED_EXT
 
+def abrir_tabela(upload):
+    """TabelaUpload do arquivo do upload (uploads antigos ficaram gravados pelo nome original)."""
+    pasta = current_app.config['UPLOAD_PASTA']
+    limite = current_app.config['UPLOAD_CACHE_MAX_MB'] * 1024 * 1024
+    return TabelaUpload(os.path.join(pasta, upload.arquivo or upload.filename), limite)
+
 @pcp_bp.route('/upload', methods=['GET', 'POST'])
 @login_required
 def upload_excel():
     if request.method == 'POST':
         file = request.files.get('file')
         if not file or not allowed_file(file.filename):
-            flash('Envie um arquivo Excel válido (.xls ou .xlsx)', 'danger')
+            flash('Envie um arquivo Excel válido (.xls, .xlsx ou .xlsm)', 'danger')
             return redirect(url_for('pcp.upload_excel'))
 
         filename = secure_filename(file.filename)
-        path = os.path.join('./uploads', filename)
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        file.save(path)
+        arquivo = salvar_upload(file, current_app.config['UPLOAD_PASTA'])
+        upload = PCPUpload(filename=filename, arquivo=arquivo, uploaded_by=current_user.id)
 
-        df = pd.read_excel(path)
-        columns = list(df.columns)
-        preview = df.head(10).to_dict(orient='records')
+        # lê a planilha só se esse conteúdo ainda não tem cache
+        with abrir_tabela(upload) as tabela:
+            columns, preview = tabela.colunas, tabela.preview(10)
 
-        upload = PCPUpload(filename=filename, uploaded_by=current_user.id)
         db.session.add(upload)
         db.session.commit()
 
@@ -39,6 +46,51 @@ def upload_excel():
                                upload_id=upload.id)
     return render_template('upload_form.html')
 
+def importar_upload(upload, mapa, user_id, chunk_size):
+    """Importa as linhas de um upload em lotes, sem commit (quem chama decide).
+
+    `mapa` liga 'cliente', 'modelo', 'quantidade' e 'pronto' às colunas da planilha.
+    As colunas já normalizadas vêm do cache do upload (cache_uploads.py), sem
+    reler o Excel. Por lote: resolve os clientes com uma consulta, insere os Items
+    com um INSERT em lote recebendo os ids gerados (RETURNING) e grava os
+    ItemHistory correspondentes com outro INSERT em lote.
+    """
+    import numpy as np
+
+    with abrir_tabela(upload) as tabela:
+        n = tabela.linhas
+        pos = {campo: tabela.colunas.index(col) for campo, col in mapa.items()
+               if col and col in tabela.colunas}
+        vazio = np.full(n, '')
+        clientes = tabela.texto(pos['cliente']) if 'cliente' in pos else vazio
+        clientes = np.where(clientes == '', 'Cliente não informado', clientes)
+        modelos = tabela.texto(pos['modelo']) if 'modelo' in pos else vazio
+        modelos = np.where(modelos == '', 'N/A', modelos)
+        quantidades = tabela.quantidade(pos['quantidade']) if 'quantidade' in pos else np.zeros(n, dtype='int64')
+        pronto = tabela.pronto(pos['pronto']) if 'pronto' in pos else np.zeros(n, dtype=bool)
+        status = np.where(pronto, 'Pronto', 'Recebido')
+
+    created = 0
+    for inicio in range(0, n, chunk_size):
+        fim = inicio + chunk_size
+        lote_clientes = clientes[inicio:fim].tolist()
+        cliente_ids = carregar_clientes(lote_clientes)
+        itens = [{
+            'cliente_id': cliente_ids[c], 'modelo': m, 'quantidade': q, 'status': st,
+            'origem_upload_id': upload.id, 'criado_por': user_id,
+        } for c, m, q, st in zip(lote_clientes, modelos[inicio:fim].tolist(),
+                                 quantidades[inicio:fim].tolist(), status[inicio:fim].tolist())]
+        ids = db.session.execute(
+            insert(Item).returning(Item.id, sort_by_parameter_order=True), itens
+        ).scalars().all()
+
+        db.session.execute(insert(ItemHistory), [
+            {'item_id': item_id, 'from_status': None, 'to_status': item['status'], 'by_user_id': user_id}
+            for item_id, item in zip(ids, itens)
+        ])
+        created += len(itens)
+    return created
+
 @pcp_bp.route('/confirm_import', methods=['POST'])
 @login_required
 def confirm_import():
@@ -49,33 +101,18 @@ def confirm_import():
     pronto_col = request.form.get('map_pronto')
 
     upload = PCPUpload.query.get(upload_id)
-    path = os.path.join('./uploads', upload.filename)
-    df = pd.read_excel(path)
-
-    created = 0
-    for _, row in df.iterrows():
-        cliente_nome = row.get(cliente_col, 'Cliente não informado')
-        modelo = str(row.get(modelo_col, 'N/A'))
-        quantidade = int(row.get(qtd_col, 0))
-        pronto_flag = bool(row.get(pronto_col)) if pronto_col else False
-
-        cliente = Cliente.query.filter_by(nome=cliente_nome).first()
-        if not cliente:
-            cliente = Cliente(nome=cliente_nome)
-            db.session.add(cliente)
-            db.session.commit()
-
-        item = Item(cliente_id=cliente.id, modelo=modelo, quantidade=quantidade,
-                    origem_upload_id=upload.id, status='Pronto' if pronto_flag else 'Recebido',
-                    criado_por=current_user.id)
-        db.session.add(item)
-        db.session.commit()
+    mapa = {'cliente': cliente_col, 'modelo': modelo_col, 'quantidade': qtd_col, 'pronto': pronto_col}
 
-        hist = ItemHistory(item_id=item.id, from_status=None,
-                           to_status=item.status, by_user_id=current_user.id)
-        db.session.add(hist)
+    inicio = time.perf_counter()
+    try:
+        created = importar_upload(upload, mapa, current_user.id, current_app.config['PCP_IMPORT_CHUNK_SIZE'])
         db.session.commit()
-        created += 1
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Erro importando upload %s", upload_id)
+        flash(f'Importação cancelada, nenhum item gravado: {e}', 'danger')
+        return redirect(url_for('pcp.upload_excel'))
+    decorrido = time.perf_counter() - inicio
 
-    flash(f'{created} itens importados com sucesso!', 'success')
+    flash(f'{created} itens importados com sucesso! ({created / decorrido if decorrido else 0:.0f} linhas/s)', 'success')
     return redirect(url_for('index'))
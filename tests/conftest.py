@@ -0,0 +1,39 @@
+# tests/conftest.py
+"""Fixtures dos testes: app com um banco SQLite temporário, sem agendador nem envio de e-mails."""
+import os
+import sys
+import tempfile
+
+import pytest
+
+_pasta = tempfile.mkdtemp(prefix='testes_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_pasta, 'testes.db')
+os.environ['UPLOAD_PASTA'] = os.path.join(_pasta, 'uploads')
+os.environ['AGENDADOR_HABILITADO'] = '0'
+os.environ['EMAIL_ENVIO_HABILITADO'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402 (depois das variáveis de ambiente)
+from models import db  # noqa: E402
+import cache_clientes  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def sessao(app):
+    """Contexto da app com as tabelas vazias e os caches em memória limpos."""
+    with app.app_context():
+        db.session.rollback()
+        for tabela in reversed(db.metadata.sorted_tables):
+            db.session.execute(tabela.delete())
+        db.session.commit()
+        cache_clientes.limpar_cache()
+        yield db.session
+        db.session.rollback()
+        db.session.remove()
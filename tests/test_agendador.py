@@ -0,0 +1,29 @@
+# tests/test_agendador.py
+import pytest
+
+pytest.importorskip('apscheduler')
+
+import agendador  # noqa: E402
+
+
+def test_importacao_inicial_so_na_primeira_lideranca(app):
+    assert {j.id for j in agendador._criar_scheduler(app).get_jobs()} == \
+        {'import_pcp_inicial', 'import_pcp_every_5m'}
+    assert {j.id for j in agendador._criar_scheduler(app, importacao_inicial=False).get_jobs()} == \
+        {'import_pcp_every_5m'}
+
+
+def test_importacao_em_execucao_fica_registrada(app, monkeypatch):
+    import import_jobs
+    em_execucao, vistos = set(), []
+
+    def importar(**kwargs):
+        vistos.append(set(em_execucao))
+        return 1, False
+    monkeypatch.setattr(import_jobs, 'submeter_importacao', importar)
+
+    scheduler = agendador._criar_scheduler(app, importacao_inicial=False, em_execucao=em_execucao)
+    scheduler.get_job('import_pcp_every_5m').func()
+
+    assert len(vistos[0]) == 1
+    assert em_execucao == set()
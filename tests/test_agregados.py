@@ -0,0 +1,28 @@
+# tests/test_agregados.py
+from datetime import date
+
+from sqlalchemy import select
+
+from agregados import reconstruir_agregados
+from importer import upsert_item_status
+from models import LeadTimeDiario
+from transicoes import transicionar_item_status
+
+
+def _lead_time(sessao):
+    return sessao.execute(select(LeadTimeDiario.cliente, LeadTimeDiario.entregas)).all()
+
+
+def test_item_importado_como_pronto_entra_no_lead_time(sessao):
+    resumo = {'created': 0, 'updated': 0, 'unchanged': 0}
+    upsert_item_status([{'cliente': 'ACME', 'modelo': 'M1', 'quantidade': 3,
+                         'status': 'Pronto', 'data': date(2024, 1, 2)}], resumo)
+    sessao.commit()
+
+    transicionar_item_status(date(2024, 1, 2), ['M1'], 'Entrega concluída', 'u')
+    sessao.commit()
+    assert _lead_time(sessao) == [('ACME', 1)]
+
+    reconstruir_agregados()
+    sessao.commit()
+    assert _lead_time(sessao) == [('ACME', 1)]
@@ -0,0 +1,40 @@
+# tests/test_bulk_update_status.py
+import pytest
+
+from models import User
+
+
+@pytest.fixture
+def http(app, sessao):
+    usuario = User(full_name='Log', username='log', role='logistica')
+    usuario.set_password('pw')
+    sessao.add(usuario)
+    sessao.commit()
+
+    http = app.test_client()
+    http.post('/auth/login', data={'username': 'log', 'password': 'pw'})
+    return http
+
+
+@pytest.mark.parametrize('item_ids', [['abc'], [None], '12', {'id': 1}])
+def test_item_ids_invalidos_retornam_400(http, item_ids):
+    resp = http.post('/bulk_update_status', json={'status': 'Entrega concluída', 'item_ids': item_ids})
+
+    assert resp.status_code == 400
+    assert resp.get_json()['success'] is False
+
+
+@pytest.mark.parametrize('modelos', ['ABC', [{'a': 1}], [1], {'modelo': 'M1'}])
+def test_modelos_invalidos_retornam_400(http, modelos):
+    resp = http.post('/bulk_update_status', json={'status': 'Pronto', 'modelos': modelos})
+
+    assert resp.status_code == 400
+    assert resp.get_json()['success'] is False
+
+
+@pytest.mark.parametrize('data', ['17/10/2026', 20261017])
+def test_data_invalida_retorna_400(http, data):
+    resp = http.post('/bulk_update_status', json={'status': 'Pronto', 'modelos': ['M1'], 'data': data})
+
+    assert resp.status_code == 400
+    assert resp.get_json()['success'] is False
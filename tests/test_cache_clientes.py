@@ -0,0 +1,45 @@
+# tests/test_cache_clientes.py
+from sqlalchemy import func, select
+
+import cache_clientes
+from cache_clientes import resolver_clientes
+from models import Cliente
+
+
+def _total_clientes(sessao):
+    return sessao.execute(select(func.count()).select_from(Cliente)).scalar()
+
+
+def test_rollback_nao_deixa_clientes_nem_ids_no_cache(sessao):
+    refs = resolver_clientes(['ACME', 'Beta'])
+    ids = {ref.id for ref in refs.values()}
+    assert _total_clientes(sessao) == 2
+
+    sessao.rollback()
+
+    assert _total_clientes(sessao) == 0
+    assert not ids & {ref.id for ref in cache_clientes._cache.values()}
+    assert 'clientes_pendentes' not in sessao().info
+
+
+def test_commit_leva_os_novos_para_o_cache(sessao):
+    refs = resolver_clientes(['ACME', 'Acmé ', 'Beta'])
+    assert refs['ACME'] == refs['Acmé ']
+    assert 'acme' not in cache_clientes._cache
+
+    sessao.commit()
+
+    assert cache_clientes._cache['acme'] == refs['ACME']
+    assert resolver_clientes(['acme'])['acme'] == refs['ACME']
+    assert _total_clientes(sessao) == 2
+
+
+def test_cliente_ja_existente_nao_e_duplicado(sessao):
+    sessao.add(Cliente(nome='Gama'))
+    sessao.commit()
+    cache_clientes.limpar_cache()
+
+    refs = resolver_clientes(['GAMA', 'Delta'])
+
+    assert refs['GAMA'].nome == 'Gama'
+    assert _total_clientes(sessao) == 2
@@ -0,0 +1,26 @@
+# tests/test_cache_uploads.py
+import hashlib
+import os
+
+from cache_uploads import liberar_espaco
+
+
+def test_liberar_espaco_so_remove_uploads_pelo_conteudo(tmp_path):
+    antigos = []
+    for i in range(3):
+        sha = hashlib.sha256(str(i).encode()).hexdigest()
+        for nome in (f'{sha}.xlsx', f'{sha}.xlsx.npz'):
+            (tmp_path / nome).write_bytes(b'x' * 100)
+            os.utime(tmp_path / nome, (1000 + i, 1000 + i))
+        antigos.append(sha)
+    legado = tmp_path / 'PCP março.xlsx'  # upload anterior, ainda referenciado por PCPUpload
+    outro = tmp_path / 'leia-me.txt'
+    for arquivo in (legado, outro):
+        arquivo.write_bytes(b'x' * 1000)
+        os.utime(arquivo, (1, 1))
+
+    assert liberar_espaco(str(tmp_path), 200) == 2
+
+    restantes = set(os.listdir(tmp_path))
+    assert {legado.name, outro.name} <= restantes
+    assert f'{antigos[2]}.xlsx' in restantes and f'{antigos[0]}.xlsx' not in restantes
@@ -0,0 +1,47 @@
+# tests/test_cache_usuarios.py
+from sqlalchemy import update
+
+import cache_usuarios
+from cache_usuarios import carregar_usuario, versao_usuario
+from models import User
+
+
+def test_alteracao_em_outro_processo_invalida_o_retrato(sessao):
+    usuario = User(full_name='Ana', username='ana', role='logistica')
+    usuario.set_password('pw')
+    sessao.add(usuario)
+    sessao.commit()
+    assert carregar_usuario(usuario.id).role == 'logistica'
+
+    # outro processo troca o papel: o evento de lá incrementa a versão, o cache daqui fica como está
+    sessao.execute(update(User).where(User.id == usuario.id).values(role='admin'))
+    cache_usuarios._incrementar_versao(sessao.connection(), usuario.id)
+    sessao.commit()
+
+    assert versao_usuario(usuario.id) == 1
+    assert carregar_usuario(usuario.id).role == 'admin'
+
+
+def test_alteracao_pelo_orm_incrementa_a_versao(sessao):
+    usuario = User(full_name='Caio', username='caio', role='pcp')
+    usuario.set_password('pw')
+    sessao.add(usuario)
+    sessao.commit()
+
+    usuario.set_password('nova')
+    sessao.commit()
+
+    assert versao_usuario(usuario.id) == 1
+
+def test_retrato_vale_enquanto_a_versao_nao_muda(sessao):
+    usuario = User(full_name='Bia', username='bia', role='pcp')
+    usuario.set_password('pw')
+    sessao.add(usuario)
+    sessao.commit()
+    primeiro = carregar_usuario(usuario.id)
+
+    # SQL direto não passa pelos eventos: o retrato em cache continua valendo até o TTL
+    sessao.execute(update(User).where(User.id == usuario.id).values(role='admin'))
+    sessao.commit()
+
+    assert carregar_usuario(usuario.id) is primeiro
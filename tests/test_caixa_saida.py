@@ -0,0 +1,88 @@
+# tests/test_caixa_saida.py
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+
+from caixa_saida import enfileirar_email, enviar_pendentes
+from models import EmailSaida
+
+controller = pytest.importorskip('aiosmtpd.controller')
+
+RECUSADO = 'recusado@exemplo.com'
+
+
+class Caixa:
+    """Servidor SMTP de teste: guarda as mensagens e a conexão (porta do cliente) de cada uma."""
+
+    def __init__(self):
+        self.mensagens = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == RECUSADO:
+            return '550 Caixa postal inexistente'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.mensagens.append((session.peer, envelope.rcpt_tos[0]))
+        return '250 Mensagem aceita'
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def configurar_smtp(app, monkeypatch):
+    def configurar(porta):
+        for chave, valor in {'MAIL_SERVER': '127.0.0.1', 'MAIL_PORT': porta, 'MAIL_USE_TLS': False,
+                             'MAIL_USE_SSL': False, 'MAIL_USERNAME': None,
+                             'EMAIL_ESPERA_BASE_SEGUNDOS': 30}.items():
+            monkeypatch.setitem(app.config, chave, valor)
+    return configurar
+
+
+@pytest.fixture
+def smtp(configurar_smtp):
+    caixa = Caixa()
+    servidor = controller.Controller(caixa, hostname='127.0.0.1', port=_porta_livre())
+    servidor.start()
+    configurar_smtp(servidor.port)
+    yield caixa
+    servidor.stop()
+
+
+def test_lote_sai_por_uma_conexao_e_recusado_falha(sessao, smtp):
+    caixa = smtp
+    for destino in ('a@exemplo.com', RECUSADO, 'b@exemplo.com'):
+        enfileirar_email(destino, 'Assunto', 'Corpo')
+    sessao.commit()
+
+    assert enviar_pendentes('teste') == {'enviados': 2, 'reagendados': 0, 'falhas': 1}
+    assert [destino for _, destino in caixa.mensagens] == ['a@exemplo.com', 'b@exemplo.com']
+    assert len({conexao for conexao, _ in caixa.mensagens}) == 1
+    status = dict(sessao.query(EmailSaida.destinatario, EmailSaida.status))
+    assert status == {'a@exemplo.com': 'enviado', RECUSADO: 'falhou', 'b@exemplo.com': 'enviado'}
+
+
+def test_servidor_fora_do_ar_reagenda_com_espera_crescente(sessao, configurar_smtp):
+    configurar_smtp(_porta_livre())  # ninguém escutando
+    mensagem = enfileirar_email('a@exemplo.com', 'Assunto', 'Corpo')
+    sessao.commit()
+
+    antes = datetime.utcnow()
+    assert enviar_pendentes('teste') == {'enviados': 0, 'reagendados': 1, 'falhas': 0}
+    sessao.refresh(mensagem)
+    assert (mensagem.status, mensagem.tentativas) == ('pendente', 1)
+    assert mensagem.proxima_tentativa_em >= antes + timedelta(seconds=30)
+
+    mensagem.proxima_tentativa_em = datetime.utcnow()  # vence a espera
+    sessao.commit()
+    antes = datetime.utcnow()
+    enviar_pendentes('teste')
+    sessao.refresh(mensagem)
+    assert mensagem.tentativas == 2
+    assert antes + timedelta(seconds=60) <= mensagem.proxima_tentativa_em < antes + timedelta(seconds=90)
@@ -0,0 +1,27 @@
+# tests/test_dashboard_cache.py
+from datetime import date
+
+from sqlalchemy import event
+
+from dashboard_cache import invalidar_datas, versao_data
+from models import db
+
+
+def test_invalidar_datas_em_lote(sessao):
+    d1, d2, d3 = date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)
+    assert invalidar_datas([d1]) == {d1: 1}
+    sessao.commit()
+
+    comandos = []
+    def contar(conn, cursor, sql, *args):
+        comandos.append(sql)
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        versoes = invalidar_datas([d1, d2, d3, d2])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    sessao.commit()
+
+    assert versoes == {d1: 2, d2: 1, d3: 1}
+    assert len(comandos) == 3
+    assert [versao_data(d) for d in (d1, d2, d3)] == [2, 1, 1]
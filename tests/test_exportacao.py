@@ -0,0 +1,53 @@
+# tests/test_exportacao.py
+from datetime import datetime
+
+from models import Cliente, Item, ItemHistory, User
+
+
+def test_historico_exporta_itens_faturados(app, sessao):
+    usuario = User(full_name='Fat', username='fat', role='faturamento')
+    usuario.set_password('pw')
+    cliente = Cliente(nome='ACME')
+    sessao.add_all([usuario, cliente])
+    sessao.flush()
+    item = Item(cliente_id=cliente.id, modelo='M1', quantidade=2, status='Faturado')
+    sessao.add(item)
+    sessao.flush()
+    sessao.add(ItemHistory(item_id=item.id, from_status='Pronto', to_status='Faturado',
+                           by_user_id=usuario.id, criado_em=datetime(2024, 1, 2, 15, 30)))
+    sessao.commit()
+
+    http = app.test_client()
+    assert http.post('/auth/login', data={'username': 'fat', 'password': 'pw'}).status_code == 302
+    resp = http.get('/exportar/item_history.csv?data_inicio=2024-01-02')
+
+    assert resp.status_code == 200
+    linhas = resp.get_data(as_text=True).lstrip('\ufeff').splitlines()
+    assert linhas[1:] == ['02/01/2024;ACME;M1;Pronto;Faturado;fat;;02/01/2024 15:30']
+
+    fora_do_periodo = http.get('/exportar/item_history.csv?data_inicio=2024-01-03')
+    assert fora_do_periodo.get_data(as_text=True).lstrip('\ufeff').splitlines()[1:] == []
+
+
+def test_xlsx_sai_em_partes_e_abre_no_openpyxl():
+    from io import BytesIO
+    from datetime import date
+    from openpyxl import load_workbook
+    from exportacao import gerar_xlsx
+
+    consumidas = []
+    def linhas():
+        for i in range(3000):
+            consumidas.append(i)
+            yield (date(2024, 1, 2), f'Cliente <{i}> & "x"', i, None, datetime(2024, 1, 2, 15, 30))
+
+    partes = gerar_xlsx(['Data', 'Cliente', 'Qtd', 'Vazio', 'Hora'], linhas(), 'item_status')
+    primeira = next(partes)
+    assert primeira and not consumidas  # cabeçalhos e partes fixas antes de ler o banco
+    corpo = primeira + b''.join(partes)
+
+    ws = load_workbook(BytesIO(corpo), read_only=True)['item_status']
+    valores = list(ws.iter_rows(values_only=True))
+    assert valores[0] == ('Data', 'Cliente', 'Qtd', 'Vazio', 'Hora')
+    assert valores[1] == (datetime(2024, 1, 2), 'Cliente <0> & "x"', 0, None, datetime(2024, 1, 2, 15, 30))
+    assert len(valores) == 3001
@@ -0,0 +1,56 @@
+# tests/test_importer.py
+import os
+
+import importer
+from importer import arquivo_inalterado, registrar_arquivo
+from models import ArquivoImportado
+
+
+def test_mtime_novo_com_mesmo_conteudo_e_gravado(sessao, tmp_path, monkeypatch):
+    planilha = tmp_path / 'pcp.xlsx'
+    planilha.write_bytes(b'conteudo')
+    registrar_arquivo(str(planilha), arquivo_inalterado(str(planilha))[1])
+    sessao.commit()
+
+    os.utime(planilha, (1_700_000_000, 1_700_000_000))  # salvo de novo, sem alterações
+    assert arquivo_inalterado(str(planilha))[0]
+    assert sessao.query(ArquivoImportado).one().mtime == 1_700_000_000
+
+    hashes = []
+    monkeypatch.setattr(importer, 'sha256_arquivo', lambda path: hashes.append(path))
+    assert arquivo_inalterado(str(planilha))[0]
+    assert hashes == []  # tamanho e mtime batem: sem reler o arquivo
+
+
+def _planilha(caminho, modelos):
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Plan-VenttosLogistica'
+    ws.append(['Data', 'Cliente', 'Modelo', 'Quantidade', 'Pronto'])
+    for i, modelo in enumerate(modelos):
+        ws.append(['02/01/2024', 'ACME', modelo, i + 1, 'sim'])
+    wb.save(caminho)
+    return {'caminho': str(caminho), 'aba': 'Plan-VenttosLogistica'}
+
+
+def test_resumo_de_uma_planilha_mantem_fases_e_inalterado(sessao, tmp_path):
+    planilha = _planilha(tmp_path / 'a.xlsx', ['M1', 'M2'])
+
+    resumo = importer.importar_planilhas([planilha], processos=1)
+    assert resumo['created'] == 2
+    assert 'leitura' in resumo['fases']
+
+    assert importer.importar_planilhas([planilha], processos=1)['arquivo_inalterado']
+
+
+def test_varias_planilhas_puladas_marcam_inalterado(sessao, tmp_path):
+    planilhas = [_planilha(tmp_path / 'a.xlsx', ['M1']), _planilha(tmp_path / 'b.xlsx', ['M2'])]
+
+    resumo = importer.importar_planilhas(planilhas, processos=1)
+    assert resumo['created'] == 2
+    assert 'arquivo_inalterado' not in resumo
+
+    resumo = importer.importar_planilhas(planilhas, processos=1)
+    assert resumo['arquivo_inalterado']
+    assert all(r['arquivo_inalterado'] for r in resumo['arquivos'].values())
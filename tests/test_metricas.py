@@ -0,0 +1,21 @@
+# tests/test_metricas.py
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import metricas
+
+ROTULOS = (('endpoint', metricas.ENDPOINT_FORA),)
+
+
+def test_comando_que_falha_nao_atrapalha_os_seguintes(sessao):
+    consultas = lambda: metricas._contadores['pcp_sql_consultas_total'].get(ROTULOS, 0)
+    antes = consultas()
+
+    with pytest.raises(OperationalError):
+        sessao.execute(text('SELECT * FROM tabela_que_nao_existe'))
+    sessao.rollback()
+    sessao.execute(text('SELECT 1'))
+
+    assert consultas() == antes + 1
+    assert 'metricas_inicio' not in sessao.connection().info
@@ -0,0 +1,41 @@
+# tests/test_migracoes.py
+from flask import Flask
+from sqlalchemy import text
+
+from migracoes import aplicar_migracoes, verificar_planos, CONSULTAS_QUENTES
+from models import db
+
+INDICES_UNICOS = ('uq_item_status_data_modelo', 'uq_cliente_nome', 'uq_cliente_chave')
+
+
+def test_migracao_de_banco_antigo_remove_duplicados_e_usa_indices(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + str(tmp_path / 'antigo.db')
+    db.init_app(app)
+    with app.app_context():
+        # banco como era antes dos índices únicos, já com colisões
+        db.create_all()
+        with db.engine.begin() as conn:
+            for indice in INDICES_UNICOS:
+                conn.execute(text(f'DROP INDEX {indice}'))
+            conn.execute(text(
+                "INSERT INTO item_status (id, cliente, modelo, quantidade, status, data, hora_ultimo_update) VALUES "
+                "(1, 'ACME', 'M1', 1, 'Recebido', '2024-01-02', '2024-01-02 08:00:00'), "
+                "(2, 'ACME', 'M1', 5, 'Pronto', '2024-01-02', '2024-01-02 09:00:00'), "
+                "(3, 'ACME', 'M2', 2, 'Recebido', '2024-01-02', NULL)"))
+            conn.execute(text("INSERT INTO cliente (id, nome) VALUES (1, 'ACME'), (2, 'ACME'), (3, 'Beta')"))
+            conn.execute(text("INSERT INTO item (id, cliente_id, modelo) VALUES (1, 2, 'M1')"))
+
+        removidos = aplicar_migracoes()
+
+        assert removidos['item_status'] == 1
+        assert removidos['cliente'] == 1
+        with db.engine.connect() as conn:
+            assert conn.execute(text("SELECT id, quantidade FROM item_status WHERE modelo = 'M1'")).all() == [(2, 5)]
+            assert conn.execute(text("SELECT cliente_id FROM item WHERE id = 1")).scalar() == 1
+            assert conn.execute(text("SELECT nome FROM cliente ORDER BY id")).scalars().all() == ['ACME', 'Beta']
+
+        planos = verificar_planos()
+        assert len(planos) == len(CONSULTAS_QUENTES)
+        assert [(descricao, plano) for descricao, _, plano, ok in planos if not ok] == []
+        db.engine.dispose()
@@ -0,0 +1,168 @@
+# transicoes.py
+"""Serviço único de transição de status para ItemStatus (painel) e Item (logística/faturamento).
+
+Todas as rotas que mudam status passam por aqui (update_status, bulk_update_status,
+logistica.atualizar_status, faturamento.marcar_faturado). Cada chamada:
+
+- lê o estado atual com uma consulta;
+- valida cada mudança na tabela TRANSICOES, calculada uma vez a partir de FLUXO;
+- grava o status com um único UPDATE e o histórico com um único INSERT em lote;
+- avisa os assinantes de ao_transicionar() com as transições feitas, dentro da
+  mesma transação e sem consultas extras.
+
+Não faz commit: quem chama confirma tudo de uma vez.
+"""
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import select, update, insert
+from models import db, ItemStatus, Item, ItemHistory
+from dashboard_cache import invalidar_datas
+
+# Status do painel, na ordem do fluxo (os mesmos do select do dashboard)
+FLUXO = [
+    'Apontamento PCP',
+    'Recebido',
+    'Pronto',
+    'Notas sendo faturadas',
+    'Faturamento confirmado',
+    'Entrega em andamento',
+    'Entrega concluída',
+]
+# Status usados só em Item, posicionados no fluxo
+EQUIVALENTES = {'Faturado': 'Faturamento confirmado'}
+
+ETAPA = {s: i for i, s in enumerate(FLUXO)}
+ETAPA.update({s: ETAPA[e] for s, e in EQUIVALENTES.items()})
+
+# Permitido avançar para qualquer etapa seguinte, trocar dentro da mesma etapa ou
+# voltar uma etapa (correção de apontamento errado)
+TRANSICOES = {
+    origem: frozenset(destino for destino in ETAPA if ETAPA[destino] >= ETAPA[origem] - 1)
+    for origem in ETAPA
+}
+
+# Papéis que podem levar um Item a cada status (padrão para os demais: logística)
+PAPEIS_POR_STATUS = {
+    'Faturado': {'faturamento', 'admin'},
+}
+PAPEIS_PADRAO = {'logistica', 'admin'}
+
+Transicao = namedtuple('Transicao', [
+    'tipo',        # 'item_status' ou 'item'
+    'id',
+    'modelo',
+    'data',        # data do painel (ItemStatus); None para Item
+    'cliente',     # nome (ItemStatus) ou cliente_id (Item)
+    'quantidade',
+    'de',
+    'para',
+    'user_id',
+    'hora',        # UTC, igual ao ItemHistory.criado_em gravado
+])
+
+_assinantes = []
+
+def ao_transicionar(fn):
+    """Registra fn(transicoes) para ser chamada após cada gravação de transições.
+
+    Roda dentro da transação, antes do commit: pode gravar junto (ex.: agregados)
+    ou agendar algo para depois do commit (ex.: eventos). Pode ser usada como decorador.
+    """
+    if fn not in _assinantes:
+        _assinantes.append(fn)
+    return fn
+
+def _notificar(transicoes):
+    if transicoes:
+        for fn in _assinantes:
+            fn(transicoes)
+
+def papeis_permitidos(novo_status):
+    return PAPEIS_POR_STATUS.get(novo_status, PAPEIS_PADRAO)
+
+def transicao_permitida(de, para):
+    # status fora do fluxo (legado ou vazio) pode ir para qualquer status conhecido
+    return para in ETAPA and (de not in TRANSICOES or para in TRANSICOES[de])
+
+def _recusa(de, para):
+    if para not in ETAPA:
+        return f"Status inválido: {para}"
+    return f"Transição não permitida: {de} → {para}"
+
+def transicionar_item_status(data, modelos, novo_status, username, user_id=None, comentario=None):
+    """Muda o status dos modelos da data. Retorna a lista de resultados por modelo."""
+    modelos = list(dict.fromkeys(modelos))
+    atuais = {
+        modelo: (id_, cliente, quantidade, status)
+        for id_, modelo, cliente, quantidade, status in db.session.execute(
+            select(ItemStatus.id, ItemStatus.modelo, ItemStatus.cliente, ItemStatus.quantidade, ItemStatus.status)
+            .where(ItemStatus.data == data, ItemStatus.modelo.in_(modelos))
+        )
+    }
+
+    agora = datetime.now()
+    registrado_em = datetime.utcnow()  # ItemHistory.criado_em é UTC
+    hora = agora.strftime('%d/%m/%Y %H:%M')
+    resultados, feitas = [], []
+    for m in modelos:
+        if m not in atuais:
+            resultados.append({'modelo': m, 'ok': False, 'msg': 'Item não encontrado'})
+            continue
+        id_, cliente, quantidade, de = atuais[m]
+        if not transicao_permitida(de, novo_status):
+            resultados.append({'modelo': m, 'ok': False, 'msg': _recusa(de, novo_status)})
+            continue
+        feitas.append(Transicao('item_status', id_, m, data, cliente, quantidade, de, novo_status,
+                                user_id, registrado_em))
+        resultados.append({'modelo': m, 'ok': True, 'status': novo_status, 'hora': hora, 'usuario': username})
+
+    if feitas:
+        versao = invalidar_datas([data])[data]
+        db.session.execute(
+            update(ItemStatus)
+            .where(ItemStatus.id.in_([t.id for t in feitas]))
+            .values(status=novo_status, usuario_ultimo_update=username,
+                    hora_ultimo_update=agora, versao=versao)
+        )
+        db.session.execute(insert(ItemHistory), [
+            {'item_status_id': t.id, 'from_status': t.de, 'to_status': t.para,
+             'by_user_id': user_id, 'comment': comentario, 'criado_em': registrado_em}
+            for t in feitas
+        ])
+        _notificar(feitas)
+    return resultados
+
+def transicionar_itens(item_ids, novo_status, user_id, comentario=None):
+    """Muda o status dos Items e grava o ItemHistory de cada um. Retorna resultados por id."""
+    item_ids = list(dict.fromkeys(item_ids))
+    atuais = {
+        id_: (cliente_id, quantidade, status)
+        for id_, cliente_id, quantidade, status in db.session.execute(
+            select(Item.id, Item.cliente_id, Item.quantidade, Item.status).where(Item.id.in_(item_ids))
+        )
+    }
+
+    agora = datetime.utcnow()
+    resultados, feitas = [], []
+    for i in item_ids:
+        if i not in atuais:
+            resultados.append({'id': i, 'ok': False, 'msg': 'Item não encontrado'})
+            continue
+        cliente_id, quantidade, de = atuais[i]
+        if not transicao_permitida(de, novo_status):
+            resultados.append({'id': i, 'ok': False, 'msg': _recusa(de, novo_status)})
+            continue
+        feitas.append(Transicao('item', i, None, None, cliente_id, quantidade, de, novo_status, user_id, agora))
+        resultados.append({'id': i, 'ok': True, 'de': de, 'status': novo_status})
+
+    if feitas:
+        db.session.execute(
+            update(Item).where(Item.id.in_([t.id for t in feitas])).values(status=novo_status)
+        )
+        db.session.execute(insert(ItemHistory), [
+            {'item_id': t.id, 'from_status': t.de, 'to_status': t.para,
+             'by_user_id': user_id, 'comment': comentario, 'criado_em': agora}
+            for t in feitas
+        ])
+        _notificar(feitas)
+    return resultados